@@ -0,0 +1,1197 @@
+#-------------------------------------------#
+#       A* search library                   #
+#-------------------------------------------#
+# Edge weight graphs, heuristic matrices and landmarks with their binary
+# caches, A*, LPA*, path caching, contraction hierarchies and batch
+# queries, no prompts so the A* script, the query server and the
+# benchmark can all import it
+
+import csv
+import heapq
+import math
+import mmap
+import multiprocessing
+import os
+import struct
+import sys
+import time
+from array import array
+from collections import OrderedDict
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+        '..', 'GRAPH'))
+import weiglej_graphstore
+
+class Graph():
+    """ Compact adjacency for an edgeweights file
+    node labels are mapped to dense integer ids once at load time and the
+    edges are kept in compressed sparse row (CSR) form
+    params:
+        labels: list, node label for each integer id
+        offsets: array, edges of node i are offsets[i] to offsets[i+1]
+        targets: array, integer id of the node each edge leads to
+        weights: array, weight of each edge
+    methods:
+        node_id: integer id of a node label
+        neighbors: (target id, weight) pairs leaving a node id
+    """
+    def __init__(self, labels, offsets, targets, weights):
+        self.labels = labels
+        self.ids = {label: i for i, label in enumerate(labels)}
+        self.offsets = offsets
+        self.targets = targets
+        self.weights = weights
+
+    def __len__(self):
+        return len(self.labels)
+
+    def __contains__(self, label):
+        return label in self.ids
+
+    def node_id(self, label):
+        return self.ids[label]
+
+    def neighbors(self, node):
+        for e in range(self.offsets[node], self.offsets[node+1]):
+            yield self.targets[e], self.weights[e]
+
+    def reversed(self):
+        """
+        Graph with the same node ids and every edge turned around
+        """
+        n = len(self.labels)
+        offsets = array('q', bytes(8 * (n + 1)))
+        for v in self.targets:
+            offsets[v+1] += 1
+        for i in range(n):
+            offsets[i+1] += offsets[i]
+        fill = array('q', offsets)
+        targets = array('i', bytes(4 * len(self.targets)))
+        weights = array('d', bytes(8 * len(self.weights)))
+        for u in range(n):
+            for e in range(self.offsets[u], self.offsets[u+1]):
+                v = self.targets[e]
+                targets[fill[v]] = u
+                weights[fill[v]] = self.weights[e]
+                fill[v] += 1
+        return Graph(self.labels, offsets, targets, weights)
+
+
+def reconstruct_path(came_from, current):
+    """
+    path reconstruction for A* algorithm
+    came_from holds the previous node id of each node id, -1 at the start
+    """
+    total_path = [current]
+    while came_from[current] != -1:
+        current = came_from[current]
+        total_path.append(current)
+    total_path.reverse()
+    return total_path
+
+def astar(graph, start, goal, h, stats=None):
+    """
+    A* search algorithm
+    open set is a binary heap of (f score, push order, node) entries,
+    stale entries are skipped when popped instead of being removed
+    if a stats dict is given the number of expanded nodes is added to
+    its "expanded" count
+    """
+    # Create needed structures
+    n = len(graph)
+    offsets = graph.offsets
+    targets = graph.targets
+    weights = graph.weights
+    estimates = h.estimates(graph, goal)
+    start = graph.node_id(start)
+    goal = graph.node_id(goal)
+    open_heap = []
+    closed_set = bytearray(n)
+    came_from = array('i', [-1]) * n
+    push_count = 0
+
+    # initialize all g and f scores to infinity
+    g_score = array('d', [math.inf]) * n
+    f_score = array('d', [math.inf]) * n
+
+    g_score[start] = 0
+    f_score[start] = estimates[start]
+    heapq.heappush(open_heap, (f_score[start], push_count, start))
+
+    # find the best path or exhaust the open set
+    while open_heap:
+        # set current as node in open set with lowest f score,
+        # ties go to the node that was pushed first
+        current_f, _, current = heapq.heappop(open_heap)
+        if closed_set[current] or current_f > f_score[current]:
+            continue
+        if(current == goal):
+            if stats is not None:
+                stats["expanded"] = (stats.get("expanded", 0)
+                        + closed_set.count(1))
+            path = reconstruct_path(came_from, current)
+            return [graph.labels[node] for node in path]
+
+        closed_set[current] = 1
+        current_g = g_score[current]
+
+        for e in range(offsets[current], offsets[current+1]):
+            neighbor = targets[e]
+            if closed_set[neighbor]:
+                continue
+
+            # tentative_g_score is the cost from start to neighbor
+            # through current
+            tentative_g_score = current_g + weights[e]
+            if tentative_g_score < g_score[neighbor]:
+                # this path is better than any previous, remember it
+                came_from[neighbor] = current
+                g_score[neighbor] = tentative_g_score
+                f_score[neighbor] = tentative_g_score + estimates[neighbor]
+                push_count += 1
+                heapq.heappush(open_heap,
+                        (f_score[neighbor], push_count, neighbor))
+
+    if stats is not None:
+        stats["expanded"] = stats.get("expanded", 0) + closed_set.count(1)
+    return False
+
+def dijkstra(graph, source):
+    """
+    single source Dijkstra search over every node reachable from source
+    returns the g scores and the came_from array of the shortest path tree,
+    the path to any node is reconstruct_path(came_from, node)
+    """
+    n = len(graph)
+    offsets = graph.offsets
+    targets = graph.targets
+    weights = graph.weights
+    source = graph.node_id(source)
+    g_score = array('d', [math.inf]) * n
+    came_from = array('i', [-1]) * n
+    closed_set = bytearray(n)
+    g_score[source] = 0
+    open_heap = [(0.0, source)]
+    while open_heap:
+        current_g, current = heapq.heappop(open_heap)
+        if closed_set[current]:
+            continue
+        closed_set[current] = 1
+        for e in range(offsets[current], offsets[current+1]):
+            neighbor = targets[e]
+            tentative_g_score = current_g + weights[e]
+            if tentative_g_score < g_score[neighbor]:
+                came_from[neighbor] = current
+                g_score[neighbor] = tentative_g_score
+                heapq.heappush(open_heap, (tentative_g_score, neighbor))
+
+    return g_score, came_from
+
+def calc_cost(graph, path, goal):
+    """
+    calculate the cost of the path found by A*
+    """
+    cost = 0
+    for i in range(0, len(path)):
+        if path[i] != goal:
+            cost += graph.weights[next_node_i(graph, path[i], path[i+1])]
+
+    return cost
+
+def next_node_i(graph, node, next_node):
+    """
+    find the index of the edge from node to next_node in the
+    graph so the cost can be calculated
+    """
+    node = graph.node_id(node)
+    next_node = graph.node_id(next_node)
+    for i in range(graph.offsets[node], graph.offsets[node+1]):
+        if graph.targets[i] == next_node:
+            return i
+
+def parse_edgeweights(file_name):
+    """
+    parse the edgeweights csv into a Graph, nodes get ids in the order they
+    first appear as the source of an edge, then as a target
+    """
+    g = weiglej_graphstore.parse_edgeweights(file_name)
+    return Graph(g.labels, g.offsets, g.targets, g.weights)
+
+def get_edgeweights(file_name):
+    """
+    load in the edgeweights file
+    store in a Graph, the csv is only parsed when the compiled graph store
+    next to it is missing or older than the csv
+    """
+    g = weiglej_graphstore.load_graph(file_name,
+            weiglej_graphstore.EDGEWEIGHTS)
+    return Graph(g.labels, g.offsets, g.targets, g.weights)
+
+class HeuristicMatrix():
+    """ Symmetric matrix of heuristic costs between every pair of nodes
+    params:
+        labels: list, node label for each row/column
+        costs: flat sequence of floats, row major len(labels)**2 entries,
+                    either an array or a memoryview over a mapped cache file
+    methods:
+        cost: heuristic cost between two node labels
+        estimates: heuristic cost from every node of a Graph to the goal
+    """
+    def __init__(self, labels, costs):
+        self.labels = labels
+        self.ids = {label: i for i, label in enumerate(labels)}
+        self.costs = costs
+        self._aligned_graph = None
+
+    def cost(self, a, b):
+        n = len(self.labels)
+        return self.costs[self.ids[a] * n + self.ids[b]]
+
+    def estimates(self, graph, goal):
+        n = len(self.labels)
+        goal_i = self.ids[goal]
+        row = self.costs[goal_i * n:(goal_i + 1) * n]
+        # graph ids usually line up with the matrix, then the row is used as
+        # is, otherwise it is reordered into graph ids (unknown nodes get 0)
+        if self._aligned_graph is not graph:
+            if graph.labels != self.labels:
+                return array('d', (row[self.ids[label]]
+                        if label in self.ids else 0.0
+                        for label in graph.labels))
+            self._aligned_graph = graph
+        return row
+
+
+HEURISTICS_CACHE_MAGIC = b'HMAT'
+HEURISTICS_CACHE_VERSION = 1
+HEURISTICS_CACHE_HEADER = struct.Struct('<4sIIIqq')
+
+def heuristics_cache_name(file_name):
+    """
+    binary cache file that sits next to the heuristics csv
+    """
+    return os.path.splitext(file_name)[0] + '.bin'
+
+def parse_heuristics(file_name):
+    """
+    parse the heuristics csv into a HeuristicMatrix
+    the FROM row holds the column labels, each row below it holds the costs
+    from its label to the columns, only the upper triangle is filled in
+    """
+    f = open(file_name, 'r')
+    reader = csv.reader(f)
+    labels = None
+    for row in reader:
+        if row and row[0] == 'FROM':
+            labels = [label for label in row[1:] if label]
+            break
+    n = len(labels)
+    costs = array('d', bytes(8 * n * n))
+    col = {label: i for i, label in enumerate(labels)}
+    for row in reader:
+        if not row or row[0] not in col:
+            continue
+        i = col[row[0]]
+        for j in range(i + 1, n):
+            if row[j+1]:
+                cost = float(row[j+1])
+                costs[i * n + j] = cost
+                costs[j * n + i] = cost
+    f.close()
+
+    return HeuristicMatrix(labels, costs)
+
+def write_heuristics_cache(heuristics, file_name, cache_name):
+    """
+    write the matrix in a flat binary form that can be memory mapped,
+    stamped with the size and modification time of the csv it came from
+    """
+    st = os.stat(file_name)
+    labels = '\n'.join(heuristics.labels).encode()
+    header = HEURISTICS_CACHE_HEADER.pack(HEURISTICS_CACHE_MAGIC,
+            HEURISTICS_CACHE_VERSION, len(heuristics.labels), len(labels),
+            st.st_size, st.st_mtime_ns)
+    pad = -(len(header) + len(labels)) % 8
+    tmp_name = cache_name + '.tmp'
+    with open(tmp_name, 'wb') as f:
+        f.write(header)
+        f.write(labels)
+        f.write(bytes(pad))
+        f.write(heuristics.costs.tobytes())
+    os.replace(tmp_name, cache_name)
+
+def read_heuristics_cache(file_name, cache_name):
+    """
+    memory map the binary cache, returns None if it is missing or stale
+    """
+    try:
+        f = open(cache_name, 'rb')
+    except FileNotFoundError:
+        return None
+    with f:
+        header = f.read(HEURISTICS_CACHE_HEADER.size)
+        if len(header) < HEURISTICS_CACHE_HEADER.size:
+            return None
+        magic, version, n, labels_len, size, mtime_ns = (
+                HEURISTICS_CACHE_HEADER.unpack(header))
+        st = os.stat(file_name)
+        if (magic != HEURISTICS_CACHE_MAGIC
+            or version != HEURISTICS_CACHE_VERSION
+            or size != st.st_size
+            or mtime_ns != st.st_mtime_ns
+        ):
+            return None
+        labels = f.read(labels_len).decode().split('\n')
+        start = HEURISTICS_CACHE_HEADER.size + labels_len
+        start += -start % 8
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    costs = memoryview(mm)[start:start + 8 * n * n].cast('d')
+    return HeuristicMatrix(labels, costs)
+
+def get_heuristics(file_name):
+    """
+    load in the heuristics file
+    store in a HeuristicMatrix, the csv is only parsed when the binary cache
+    next to it is missing or older than the csv
+    """
+    cache_name = heuristics_cache_name(file_name)
+    heuristics = read_heuristics_cache(file_name, cache_name)
+    if heuristics is None:
+        heuristics = parse_heuristics(file_name)
+        try:
+            write_heuristics_cache(heuristics, file_name, cache_name)
+        except OSError:
+            pass
+
+    return heuristics
+
+class Landmarks():
+    """ ALT heuristic built from shortest path costs to and from a few
+    landmark nodes, by the triangle inequality the cost from v to the goal
+    is at least d(L, goal) - d(L, v) and d(v, L) - d(goal, L) for every
+    landmark L, which only needs O(kV) costs instead of all pairs
+    params:
+        landmarks: array, node ids of the k landmarks
+        from_costs: flat array, row i holds the costs from landmark i to
+                    every node id
+        to_costs: flat array, row i holds the costs from every node id to
+                    landmark i
+    methods:
+        estimates: heuristic cost from every node of the Graph to the goal,
+                    worked out lazily as A* touches the nodes
+    """
+    def __init__(self, landmarks, from_costs, to_costs):
+        self.landmarks = landmarks
+        self.from_costs = from_costs
+        self.to_costs = to_costs
+
+    def estimates(self, graph, goal):
+        return LandmarkEstimates(self, graph.node_id(goal), len(graph))
+
+
+class LandmarkEstimates():
+    """ Per search view of a Landmarks heuristic towards one goal
+    params:
+        landmarks: class, Landmarks
+        goal: int, node id of the goal
+        n: int, number of nodes in the graph
+    indexing by a node id gives the estimate, each node is worked out once
+    """
+    def __init__(self, landmarks, goal, n):
+        self.from_costs = landmarks.from_costs
+        self.to_costs = landmarks.to_costs
+        self.n = n
+        k = len(landmarks.landmarks)
+        self.goal_from = [self.from_costs[i * n + goal] for i in range(k)]
+        self.goal_to = [self.to_costs[i * n + goal] for i in range(k)]
+        self.cache = array('d', [-1.0]) * n
+
+    def __getitem__(self, node):
+        best = self.cache[node]
+        if best < 0:
+            best = 0.0
+            n = self.n
+            row = node
+            for goal_from, goal_to in zip(self.goal_from, self.goal_to):
+                # inf - inf is nan and never beats best, so unreachable
+                # landmarks drop out on their own
+                estimate = goal_from - self.from_costs[row]
+                if estimate > best:
+                    best = estimate
+                estimate = self.to_costs[row] - goal_to
+                if estimate > best:
+                    best = estimate
+                row += n
+            self.cache[node] = best
+        return best
+
+
+def build_landmarks(graph, k=8):
+    """
+    pick k landmarks by farthest point selection, each new landmark is the
+    node furthest from the ones already picked, and store the Dijkstra costs
+    from every landmark and, over the reversed graph, to every landmark
+    """
+    n = len(graph)
+    k = min(k, n)
+    reverse = graph.reversed()
+    landmarks = array('i')
+    from_costs = array('d')
+    to_costs = array('d')
+    nearest = array('d', [math.inf]) * n
+    node = 0
+    for i in range(k):
+        landmarks.append(node)
+        g_score, _ = dijkstra(graph, graph.labels[node])
+        from_costs.extend(g_score)
+        to_costs.extend(dijkstra(reverse, graph.labels[node])[0])
+        for v in range(n):
+            if g_score[v] < nearest[v]:
+                nearest[v] = g_score[v]
+        # the next landmark is the reachable node furthest from all picked
+        # ones, or an unreached node so other components get covered too
+        far = -1.0
+        for v in range(n):
+            cost = nearest[v]
+            if cost == math.inf:
+                node = v
+                break
+            if cost > far:
+                far = cost
+                node = v
+
+    return Landmarks(landmarks, from_costs, to_costs)
+
+
+LANDMARKS_CACHE_MAGIC = b'ALTL'
+LANDMARKS_CACHE_VERSION = 1
+LANDMARKS_CACHE_HEADER = struct.Struct('<4sIIIqq')
+
+def landmarks_cache_name(file_name):
+    """
+    binary landmark file that sits next to the edgeweights csv
+    """
+    return os.path.splitext(file_name)[0] + '.alt.bin'
+
+def write_landmarks_cache(landmarks, file_name, cache_name):
+    """
+    write the landmark costs in a flat binary form that can be memory
+    mapped, stamped with the size and modification time of the csv the
+    graph came from
+    """
+    st = os.stat(file_name)
+    k = len(landmarks.landmarks)
+    n = len(landmarks.from_costs) // k if k else 0
+    header = LANDMARKS_CACHE_HEADER.pack(LANDMARKS_CACHE_MAGIC,
+            LANDMARKS_CACHE_VERSION, k, n, st.st_size, st.st_mtime_ns)
+    pad = -(len(header) + 4 * k) % 8
+    tmp_name = cache_name + '.tmp'
+    with open(tmp_name, 'wb') as f:
+        f.write(header)
+        f.write(landmarks.landmarks.tobytes())
+        f.write(bytes(pad))
+        f.write(landmarks.from_costs.tobytes())
+        f.write(landmarks.to_costs.tobytes())
+    os.replace(tmp_name, cache_name)
+
+def read_landmarks_cache(file_name, cache_name, k, n):
+    """
+    memory map the landmark file, returns None if it is missing, stale or
+    was built with a different k or number of nodes
+    """
+    try:
+        f = open(cache_name, 'rb')
+    except FileNotFoundError:
+        return None
+    with f:
+        header = f.read(LANDMARKS_CACHE_HEADER.size)
+        if len(header) < LANDMARKS_CACHE_HEADER.size:
+            return None
+        magic, version, cache_k, cache_n, size, mtime_ns = (
+                LANDMARKS_CACHE_HEADER.unpack(header))
+        st = os.stat(file_name)
+        if (magic != LANDMARKS_CACHE_MAGIC
+            or version != LANDMARKS_CACHE_VERSION
+            or cache_k != k
+            or cache_n != n
+            or size != st.st_size
+            or mtime_ns != st.st_mtime_ns
+        ):
+            return None
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mm)
+    start = LANDMARKS_CACHE_HEADER.size
+    landmarks = view[start:start + 4 * k].cast('i')
+    start += 4 * k
+    start += -start % 8
+    from_costs = view[start:start + 8 * k * n].cast('d')
+    start += 8 * k * n
+    to_costs = view[start:start + 8 * k * n].cast('d')
+    return Landmarks(landmarks, from_costs, to_costs)
+
+def get_landmarks(file_name, graph, k=8):
+    """
+    load the landmarks for the graph loaded from the edgeweights file
+    file_name, they are only rebuilt when the landmark file next to it is
+    missing or older than the csv
+    """
+    k = min(k, len(graph))
+    cache_name = landmarks_cache_name(file_name)
+    landmarks = read_landmarks_cache(file_name, cache_name, k, len(graph))
+    if landmarks is None:
+        landmarks = build_landmarks(graph, k)
+        try:
+            write_landmarks_cache(landmarks, file_name, cache_name)
+        except OSError:
+            pass
+
+    return landmarks
+
+_worker_graph = None
+_worker_heuristics = None
+
+def _init_astar_worker(edgeweights_file, heuristics_file):
+    """
+    map the compiled graph and heuristics caches into a worker process,
+    every worker shares the same read-only pages
+    """
+    global _worker_graph, _worker_heuristics
+    _worker_graph = get_edgeweights(edgeweights_file)
+    _worker_heuristics = read_heuristics_cache(
+            heuristics_file, heuristics_cache_name(heuristics_file))
+
+def _astar_query(pair, graph=None, h=None):
+    """
+    answer one (start, goal) query as (start, goal, cost, path)
+    cost is None and path is False when there is no path
+    """
+    if graph is None:
+        graph = _worker_graph
+        h = _worker_heuristics
+    start, goal = str(pair[0]), str(pair[1])
+    path = astar(graph, start, goal, h)
+    if path:
+        return start, goal, calc_cost(graph, path, goal), path
+    return start, goal, None, path
+
+def astar_many(pairs, edgeweights_file, heuristics_file, processes=None,
+        chunksize=64):
+    """
+    run A* for many (start, goal) pairs, loading the files only once
+    the graph and heuristics are compiled into their binary caches and the
+    worker processes memory map those, results are yielded as
+    (start, goal, cost, path) in the same order as pairs
+    """
+    graph = get_edgeweights(edgeweights_file)
+    heuristics = get_heuristics(heuristics_file)
+    if processes == 1:
+        for pair in pairs:
+            yield _astar_query(pair, graph, heuristics)
+        return
+
+    # the workers need the caches on disk, write them if that failed above
+    if not isinstance(graph.offsets, memoryview):
+        weiglej_graphstore.write_store(graph, edgeweights_file,
+                weiglej_graphstore.store_file_name(edgeweights_file))
+    if not isinstance(heuristics.costs, memoryview):
+        write_heuristics_cache(heuristics, heuristics_file,
+                heuristics_cache_name(heuristics_file))
+    with multiprocessing.Pool(processes, _init_astar_worker,
+            (edgeweights_file, heuristics_file)) as pool:
+        for result in pool.imap(_astar_query, pairs, chunksize):
+            yield result
+
+class LPAStar():
+    """ Lifelong Planning A* between a fixed start and goal
+    keeps its g and rhs scores between calls so that after edge weights
+    change only the nodes whose costs are affected are searched again
+    params:
+        graph: class, Graph, its weights are copied so updates stay local
+        start: str, label of the start node
+        goal: str, label of the goal node
+        h: heuristics with an estimates method, or None for no heuristic,
+                    it has to stay consistent for the updated weights,
+                    lowering weights can break landmark or matrix bounds
+    methods:
+        plan: (cost, path) for the current weights, None and False if
+                    there is no path
+        update_edge: change the weight of the edge u to v
+    """
+    def __init__(self, graph, start, goal, h=None):
+        n = len(graph)
+        self.graph = graph
+        self.start = graph.node_id(start)
+        self.goal = graph.node_id(goal)
+        self.offsets = graph.offsets
+        self.targets = graph.targets
+        self.weights = array('d', graph.weights)
+        if h is None:
+            self.estimates = array('d', bytes(8 * n))
+        else:
+            self.estimates = h.estimates(graph, goal)
+
+        # predecessor lists as CSR, pred_edges holds the forward edge index
+        # so both directions read the same weights
+        pred_offsets = array('q', bytes(8 * (n + 1)))
+        for v in self.targets:
+            pred_offsets[v+1] += 1
+        for i in range(n):
+            pred_offsets[i+1] += pred_offsets[i]
+        fill = array('q', pred_offsets)
+        self.pred_offsets = pred_offsets
+        self.pred_sources = array('i', bytes(4 * len(self.targets)))
+        self.pred_edges = array('q', bytes(8 * len(self.targets)))
+        for u in range(n):
+            for e in range(self.offsets[u], self.offsets[u+1]):
+                v = self.targets[e]
+                self.pred_sources[fill[v]] = u
+                self.pred_edges[fill[v]] = e
+                fill[v] += 1
+
+        self.g_score = array('d', [math.inf]) * n
+        self.rhs = array('d', [math.inf]) * n
+        self.rhs[self.start] = 0
+        # open set is a heap with lazy deletion, queued holds the key each
+        # node is currently queued with
+        self.open_heap = []
+        self.queued = {}
+        self.push_count = 0
+        self.expanded = 0
+        self._push(self.start)
+
+    def _key(self, node):
+        best = min(self.g_score[node], self.rhs[node])
+        return (best + self.estimates[node], best)
+
+    def _push(self, node):
+        key = self._key(node)
+        self.queued[node] = key
+        self.push_count += 1
+        heapq.heappush(self.open_heap, (key, self.push_count, node))
+
+    def _top_key(self):
+        """
+        smallest valid key in the open set, dropping stale entries
+        """
+        while self.open_heap:
+            key, _, node = self.open_heap[0]
+            if self.queued.get(node) == key:
+                return key
+            heapq.heappop(self.open_heap)
+        return (math.inf, math.inf)
+
+    def _update_vertex(self, node):
+        if node != self.start:
+            best = math.inf
+            for e in range(self.pred_offsets[node], self.pred_offsets[node+1]):
+                cost = (self.g_score[self.pred_sources[e]]
+                        + self.weights[self.pred_edges[e]])
+                if cost < best:
+                    best = cost
+            self.rhs[node] = best
+        self.queued.pop(node, None)
+        if self.g_score[node] != self.rhs[node]:
+            self._push(node)
+
+    def _compute_shortest_path(self):
+        goal = self.goal
+        while (self._top_key() < self._key(goal)
+            or self.rhs[goal] != self.g_score[goal]
+        ):
+            _, _, node = heapq.heappop(self.open_heap)
+            del self.queued[node]
+            self.expanded += 1
+            if self.g_score[node] > self.rhs[node]:
+                # overconsistent, the node's cost went down
+                self.g_score[node] = self.rhs[node]
+            else:
+                # underconsistent, the node's cost went up
+                self.g_score[node] = math.inf
+                self._update_vertex(node)
+            for e in range(self.offsets[node], self.offsets[node+1]):
+                self._update_vertex(self.targets[e])
+
+    def update_edge(self, u, v, w):
+        e = next_node_i(self.graph, str(u), str(v))
+        if e is None:
+            raise KeyError("no edge from " + str(u) + " to " + str(v))
+        self.weights[e] = float(w)
+        self._update_vertex(self.targets[e])
+
+    def plan(self):
+        self._compute_shortest_path()
+        if self.g_score[self.goal] == math.inf:
+            return None, False
+
+        # walk back from the goal along the predecessors that give g
+        path = [self.goal]
+        edges = []
+        node = self.goal
+        while node != self.start:
+            best = math.inf
+            for e in range(self.pred_offsets[node], self.pred_offsets[node+1]):
+                cost = (self.g_score[self.pred_sources[e]]
+                        + self.weights[self.pred_edges[e]])
+                if cost < best:
+                    best = cost
+                    best_e = e
+            node = self.pred_sources[best_e]
+            path.append(node)
+            edges.append(self.pred_edges[best_e])
+        path.reverse()
+        cost = 0
+        for e in reversed(edges):
+            cost += self.weights[e]
+        return cost, [self.graph.labels[node] for node in path]
+
+
+class PathCache():
+    """ Bounded LRU cache of (cost, path) answers for one edgeweights file
+    params:
+        edgeweights_file: str, csv the graph is loaded from
+        heuristics_file: str, csv the A* heuristics are loaded from
+        max_size: int, most (start, goal) answers to keep
+    methods:
+        query: (cost, path) from start to goal, from the cache, a kept
+                    shortest path tree of start, or a new A* search
+        add_tree: run Dijkstra from a popular source and keep its tree
+        stats: hit and miss counters
+    the cache and trees are dropped whenever the edgeweights file changes
+    """
+    def __init__(self, edgeweights_file, heuristics_file, max_size=4096):
+        self.edgeweights_file = edgeweights_file
+        self.heuristics_file = heuristics_file
+        self.max_size = max_size
+        self.heuristics = get_heuristics(heuristics_file)
+        self.version = None
+        self.hits = 0
+        self.tree_hits = 0
+        self.misses = 0
+        self.refresh()
+
+    def refresh(self):
+        """
+        reload the graph and drop every answer if the edgeweights file
+        changed since it was loaded
+        """
+        st = os.stat(self.edgeweights_file)
+        version = (st.st_size, st.st_mtime_ns)
+        if version != self.version:
+            self.graph = get_edgeweights(self.edgeweights_file)
+            self.version = version
+            self.answers = OrderedDict()
+            self.trees = {}
+
+    def add_tree(self, source):
+        source = str(source)
+        self.refresh()
+        self.trees[source] = dijkstra(self.graph, source)
+
+    def query(self, start, goal):
+        start, goal = str(start), str(goal)
+        self.refresh()
+        key = (start, goal, self.version)
+        if key in self.answers:
+            self.hits += 1
+            self.answers.move_to_end(key)
+            return self.answers[key]
+
+        if start in self.trees:
+            self.tree_hits += 1
+            g_score, came_from = self.trees[start]
+            goal_i = self.graph.node_id(goal)
+            if g_score[goal_i] == math.inf:
+                answer = (None, False)
+            else:
+                path = reconstruct_path(came_from, goal_i)
+                answer = (g_score[goal_i],
+                        [self.graph.labels[node] for node in path])
+        else:
+            self.misses += 1
+            path = astar(self.graph, start, goal, self.heuristics)
+            if path:
+                answer = (calc_cost(self.graph, path, goal), path)
+            else:
+                answer = (None, path)
+
+        self.answers[key] = answer
+        if len(self.answers) > self.max_size:
+            self.answers.popitem(last=False)
+        return answer
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "tree_hits": self.tree_hits,
+            "misses": self.misses,
+            "size": len(self.answers),
+            "trees": len(self.trees),
+        }
+
+
+class ContractionHierarchy():
+    """ Contraction hierarchy over a Graph for fast point to point queries
+    every node has a rank, upward edges lead to higher ranked nodes and
+    downward edges are stored at their lower ranked end so both searches
+    only ever climb, shortcut edges remember the node they skip over
+    params:
+        labels: list, node label for each integer id
+        rank: array, contraction order of each node id
+        up: tuple of CSR arrays (offsets, targets, weights, middles) of the
+                    edges from each node to higher ranked nodes
+        down: tuple of CSR arrays (offsets, sources, weights, middles) of
+                    the edges into each node from higher ranked nodes
+    methods:
+        query: (cost, path) between two node labels, None and False if
+                    there is no path
+    """
+    def __init__(self, labels, rank, up, down):
+        self.labels = labels
+        self.ids = {label: i for i, label in enumerate(labels)}
+        self.rank = rank
+        self.up = up
+        self.down = down
+
+    def _upward_search(self, heap, dist, pred, edges):
+        """
+        settle the closest node of one search direction and relax its
+        upward edges, returns the settled node or -1 for a stale entry
+        """
+        offsets, targets, weights, _ = edges
+        d, u = heapq.heappop(heap)
+        if d > dist[u]:
+            return -1
+        for e in range(offsets[u], offsets[u+1]):
+            w = targets[e]
+            nd = d + weights[e]
+            if nd < dist.get(w, math.inf):
+                dist[w] = nd
+                pred[w] = u
+                heapq.heappush(heap, (nd, w))
+        return u
+
+    def _edge(self, a, b):
+        """
+        (weight, middle) of the hierarchy edge from a to b
+        """
+        if self.rank[a] < self.rank[b]:
+            offsets, targets, weights, middles = self.up
+            node, other = a, b
+        else:
+            offsets, targets, weights, middles = self.down
+            node, other = b, a
+        for e in range(offsets[node], offsets[node+1]):
+            if targets[e] == other:
+                return weights[e], middles[e]
+
+    def _unpack(self, a, b, path, costs):
+        """
+        append the original edges behind the hierarchy edge a to b
+        """
+        stack = [(a, b)]
+        while stack:
+            a, b = stack.pop()
+            weight, middle = self._edge(a, b)
+            if middle == -1:
+                path.append(b)
+                costs.append(weight)
+            else:
+                stack.append((middle, b))
+                stack.append((a, middle))
+
+    def query(self, start, goal):
+        s = self.ids[start]
+        t = self.ids[goal]
+        if s == t:
+            return 0, [start]
+        dist_f = {s: 0.0}
+        dist_b = {t: 0.0}
+        pred_f = {s: -1}
+        pred_b = {t: -1}
+        heap_f = [(0.0, s)]
+        heap_b = [(0.0, t)]
+        best = math.inf
+        meet = -1
+        # a direction is done once its closest node is no better than the
+        # best meeting point found so far
+        while ((heap_f and heap_f[0][0] < best)
+            or (heap_b and heap_b[0][0] < best)
+        ):
+            forward = (heap_f and heap_f[0][0] < best
+                    and (not heap_b or heap_b[0][0] >= best
+                        or heap_f[0][0] <= heap_b[0][0]))
+            if forward:
+                u = self._upward_search(heap_f, dist_f, pred_f, self.up)
+                other = dist_b
+                dist = dist_f
+            else:
+                u = self._upward_search(heap_b, dist_b, pred_b, self.down)
+                other = dist_f
+                dist = dist_b
+            if u != -1 and u in other and dist[u] + other[u] < best:
+                best = dist[u] + other[u]
+                meet = u
+        if meet == -1:
+            return None, False
+
+        # hierarchy path start -> meet -> goal, then unpack the shortcuts
+        nodes = []
+        u = meet
+        while u != -1:
+            nodes.append(u)
+            u = pred_f[u]
+        nodes.reverse()
+        u = pred_b[meet]
+        while u != -1:
+            nodes.append(u)
+            u = pred_b[u]
+        path = [s]
+        costs = []
+        for i in range(len(nodes) - 1):
+            self._unpack(nodes[i], nodes[i+1], path, costs)
+        cost = 0
+        for weight in costs:
+            cost += weight
+        return cost, [self.labels[node] for node in path]
+
+
+def _witness_search(out_edges, source, skip, limit, max_settled):
+    """
+    costs from source in the remaining graph without the node skip, the
+    search stops past limit or after max_settled nodes
+    """
+    dist = {source: 0.0}
+    heap = [(0.0, source)]
+    settled = 0
+    while heap and settled < max_settled:
+        d, u = heapq.heappop(heap)
+        if d > limit:
+            break
+        if d > dist[u]:
+            continue
+        settled += 1
+        for w, (weight, _) in out_edges[u].items():
+            nd = d + weight
+            if w != skip and nd < dist.get(w, math.inf):
+                dist[w] = nd
+                heapq.heappush(heap, (nd, w))
+    return dist
+
+def _contraction_shortcuts(out_edges, in_edges, v, max_settled):
+    """
+    shortcuts (u, w, cost) needed to keep every shortest path through v
+    once v is removed from the remaining graph
+    """
+    shortcuts = []
+    for u, (in_weight, _) in in_edges[v].items():
+        outs = [(w, in_weight + weight)
+                for w, (weight, _) in out_edges[v].items() if w != u]
+        if not outs:
+            continue
+        limit = max(cost for _, cost in outs)
+        dist = _witness_search(out_edges, u, v, limit, max_settled)
+        for w, cost in outs:
+            if cost < dist.get(w, math.inf):
+                shortcuts.append((u, w, cost))
+    return shortcuts
+
+def build_ch(graph, max_settled=50):
+    """
+    contract the nodes one at a time in order of edge difference (shortcuts
+    added minus edges removed) plus already contracted neighbors, with lazy
+    priority updates, max_settled bounds each witness search
+    """
+    n = len(graph)
+    out_edges = [dict() for _ in range(n)]
+    in_edges = [dict() for _ in range(n)]
+    for u in range(n):
+        for w, weight in graph.neighbors(u):
+            if u != w and weight < out_edges[u].get(w, (math.inf,))[0]:
+                out_edges[u][w] = (weight, -1)
+                in_edges[w][u] = (weight, -1)
+
+    def priority(v):
+        shortcuts = _contraction_shortcuts(out_edges, in_edges, v,
+                max_settled)
+        return (len(shortcuts) - len(in_edges[v]) - len(out_edges[v])
+                + deleted[v])
+
+    deleted = [0] * n
+    heap = [(priority(v), v) for v in range(n)]
+    heapq.heapify(heap)
+    rank = array('i', bytes(4 * n))
+    up = [None] * n
+    down = [None] * n
+    order = 0
+    while heap:
+        _, v = heapq.heappop(heap)
+        # lazy update, put v back if it is no longer the cheapest
+        p = priority(v)
+        if heap and p > heap[0][0]:
+            heapq.heappush(heap, (p, v))
+            continue
+
+        for u, w, cost in _contraction_shortcuts(out_edges, in_edges, v,
+                max_settled):
+            if cost < out_edges[u].get(w, (math.inf,))[0]:
+                out_edges[u][w] = (cost, v)
+                in_edges[w][u] = (cost, v)
+        rank[v] = order
+        order += 1
+        up[v] = out_edges[v]
+        down[v] = in_edges[v]
+        for w in out_edges[v]:
+            del in_edges[w][v]
+            deleted[w] += 1
+        for u in in_edges[v]:
+            del out_edges[u][v]
+            deleted[u] += 1
+        out_edges[v] = {}
+        in_edges[v] = {}
+
+    return ContractionHierarchy(graph.labels, rank,
+            _ch_csr(up), _ch_csr(down))
+
+def _ch_csr(edges):
+    """
+    pack per node {other: (weight, middle)} dicts into CSR arrays
+    """
+    offsets = array('q', [0])
+    targets = array('i')
+    weights = array('d')
+    middles = array('i')
+    for node_edges in edges:
+        for other, (weight, middle) in node_edges.items():
+            targets.append(other)
+            weights.append(weight)
+            middles.append(middle)
+        offsets.append(len(targets))
+    return offsets, targets, weights, middles
+
+
+CH_CACHE_MAGIC = b'CHRG'
+CH_CACHE_VERSION = 1
+CH_CACHE_HEADER = struct.Struct('<4sIIIqqqq')
+
+def ch_cache_name(file_name):
+    """
+    binary contraction hierarchy file that sits next to the edgeweights csv
+    """
+    return os.path.splitext(file_name)[0] + '.ch.bin'
+
+def write_ch_cache(ch, file_name, cache_name):
+    """
+    write the hierarchy in a flat binary form that can be memory mapped,
+    stamped with the size and modification time of the csv it came from
+    """
+    st = os.stat(file_name)
+    labels = '\n'.join(ch.labels).encode()
+    header = CH_CACHE_HEADER.pack(CH_CACHE_MAGIC, CH_CACHE_VERSION,
+            len(ch.labels), len(labels), len(ch.up[1]), len(ch.down[1]),
+            st.st_size, st.st_mtime_ns)
+    pad = -(len(header) + len(labels)) % 8
+    tmp_name = cache_name + '.tmp'
+    with open(tmp_name, 'wb') as f:
+        f.write(header)
+        f.write(labels)
+        f.write(bytes(pad))
+        for offsets, targets, weights, middles in (ch.up, ch.down):
+            f.write(offsets.tobytes())
+            f.write(weights.tobytes())
+        for offsets, targets, weights, middles in (ch.up, ch.down):
+            f.write(targets.tobytes())
+            f.write(middles.tobytes())
+        f.write(ch.rank.tobytes())
+    os.replace(tmp_name, cache_name)
+
+def read_ch_cache(file_name, cache_name):
+    """
+    memory map the hierarchy file, returns None if it is missing or stale
+    """
+    try:
+        f = open(cache_name, 'rb')
+    except FileNotFoundError:
+        return None
+    with f:
+        header = f.read(CH_CACHE_HEADER.size)
+        if len(header) < CH_CACHE_HEADER.size:
+            return None
+        magic, version, n, labels_len, m_up, m_down, size, mtime_ns = (
+                CH_CACHE_HEADER.unpack(header))
+        st = os.stat(file_name)
+        if (magic != CH_CACHE_MAGIC
+            or version != CH_CACHE_VERSION
+            or size != st.st_size
+            or mtime_ns != st.st_mtime_ns
+        ):
+            return None
+        labels = f.read(labels_len).decode().split('\n') if n else []
+        start = CH_CACHE_HEADER.size + labels_len
+        start += -start % 8
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mm)
+
+    def take(count, size, code):
+        nonlocal start
+        part = view[start:start + size * count].cast(code)
+        start += size * count
+        return part
+
+    up_offsets = take(n + 1, 8, 'q')
+    up_weights = take(m_up, 8, 'd')
+    down_offsets = take(n + 1, 8, 'q')
+    down_weights = take(m_down, 8, 'd')
+    up_targets = take(m_up, 4, 'i')
+    up_middles = take(m_up, 4, 'i')
+    down_sources = take(m_down, 4, 'i')
+    down_middles = take(m_down, 4, 'i')
+    rank = take(n, 4, 'i')
+    return ContractionHierarchy(labels, rank,
+            (up_offsets, up_targets, up_weights, up_middles),
+            (down_offsets, down_sources, down_weights, down_middles))
+
+def get_ch(file_name, graph=None):
+    """
+    load the contraction hierarchy for the edgeweights file, it is only
+    rebuilt when the hierarchy file next to it is missing or older than
+    the csv
+    """
+    cache_name = ch_cache_name(file_name)
+    ch = read_ch_cache(file_name, cache_name)
+    if ch is None:
+        if graph is None:
+            graph = get_edgeweights(file_name)
+        ch = build_ch(graph)
+        try:
+            write_ch_cache(ch, file_name, cache_name)
+        except OSError:
+            pass
+
+    return ch
+
+def benchmark_ch(graph, ch, h, pairs):
+    """
+    time the same queries through astar() and the contraction hierarchy,
+    counts the queries where the two costs disagree
+    """
+    t0 = time.perf_counter()
+    astar_costs = []
+    for start, goal in pairs:
+        path = astar(graph, start, goal, h)
+        astar_costs.append(calc_cost(graph, path, goal) if path else None)
+    t1 = time.perf_counter()
+    ch_costs = []
+    for start, goal in pairs:
+        ch_costs.append(ch.query(start, goal)[0])
+    t2 = time.perf_counter()
+
+    mismatches = 0
+    for a, c in zip(astar_costs, ch_costs):
+        if (a is None) != (c is None) or (a is not None
+                and abs(a - c) > 1e-9 * max(1.0, abs(a))):
+            mismatches += 1
+    print("Queries: " + str(len(pairs)))
+    print("A*: " + str((t1 - t0) / len(pairs) * 1e6) + " us per query")
+    print("CH: " + str((t2 - t1) / len(pairs) * 1e6) + " us per query")
+    print("Cost mismatches: " + str(mismatches))
+    return mismatches
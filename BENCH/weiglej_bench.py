@@ -0,0 +1,164 @@
+#-------------------------------------------#
+#       Search scaling benchmark            #
+#-------------------------------------------#
+# Generates graphs of growing size with weiglej_graphgen and times the
+# loaders and searches of the A* and BFS/DFS libraries on each, reporting
+# nodes expanded per second and peak traced memory, e.g.
+#   python weiglej_bench.py --kind grid --sizes 1000 10000 100000
+
+import argparse
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import weiglej_graphgen
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+sys.path.insert(0, os.path.join(ROOT, "ASTAR"))
+sys.path.insert(0, os.path.join(ROOT, "BFS_DFS"))
+import weiglej_astar
+import weiglej_search
+
+
+def measure(fn, memory):
+    """ Runs fn once, timed or under tracemalloc
+    returns:
+        (result, seconds) or (result, peak bytes) when memory is set
+    """
+    if memory:
+        tracemalloc.start()
+        result = fn()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return result, peak
+    t0 = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - t0
+
+
+def run_astar(graph, h, pairs):
+    stats = {"expanded": 0}
+    for start, goal in pairs:
+        weiglej_astar.astar(graph, start, goal, h, stats)
+    return stats["expanded"]
+
+
+def run_bfs(adj, pairs):
+    stats = {"expanded": 0}
+    for start, goal in pairs:
+        weiglej_search.bfs(adj, start, goal, stats)
+    return stats["expanded"]
+
+
+def run_bidirectional_bfs(adj, radj, pairs):
+    stats = {"expanded": 0}
+    for start, goal in pairs:
+        weiglej_search.bidirectional_bfs(adj, radj, start, goal, stats)
+    return stats["expanded"]
+
+
+def run_dfs(adj, pairs):
+    stats = {"expanded": 0}
+    for start, goal in pairs:
+        weiglej_search.dfs(adj, start, goal, stats)
+    return stats["expanded"]
+
+
+def bench_size(kind, n, out_dir, queries, seed, heuristics_max):
+    """ Generates one graph and benchmarks every operation on it
+    returns:
+        list of result rows, one per operation
+    """
+    files = weiglej_graphgen.generate(kind, n, out_dir, seed,
+            n <= heuristics_max)
+    edgeweights_file = files["edgeweights"]
+    rng = random.Random(seed)
+    pairs = [(rng.randint(1, n), rng.randint(1, n)) for _ in range(queries)]
+    label_pairs = [(str(s), str(g)) for s, g in pairs]
+
+    graph = weiglej_astar.parse_edgeweights(edgeweights_file)
+    if files["heuristics"]:
+        h = weiglej_astar.get_heuristics(files["heuristics"])
+    else:
+        h = weiglej_astar.get_landmarks(edgeweights_file, graph)
+    adj = weiglej_search.get_adjacency(files["adjacency"])
+    radj = adj.reversed()
+
+    operations = [
+        ("get_edgeweights (csv)",
+            lambda: weiglej_astar.parse_edgeweights(edgeweights_file), 0),
+        ("get_edgeweights (cached)",
+            lambda: weiglej_astar.get_edgeweights(edgeweights_file), 0),
+        ("astar", lambda: run_astar(graph, h, label_pairs), queries),
+        ("bfs", lambda: run_bfs(adj, pairs), queries),
+        ("bidirectional bfs",
+            lambda: run_bidirectional_bfs(adj, radj, pairs), queries),
+        ("dfs", lambda: run_dfs(adj, pairs), queries),
+    ]
+    # write the binary cache so the cached load really reads it
+    weiglej_astar.get_edgeweights(edgeweights_file)
+
+    rows = []
+    for name, fn, count in operations:
+        row = {
+            "kind": kind,
+            "nodes": n,
+            "edges": len(graph.targets),
+            "operation": name,
+            "queries": count,
+        }
+        expanded, seconds = measure(fn, False)
+        _, peak = measure(fn, True)
+        row["seconds"] = seconds
+        row["peak_mb"] = peak / 2**20
+        if count:
+            row["expanded"] = expanded
+            row["expanded_per_s"] = expanded / seconds if seconds else 0
+        rows.append(row)
+    return rows
+
+
+def print_row(row):
+    line = "{:>9} {:>9} {:<26}".format(row["kind"], row["nodes"],
+            row["operation"])
+    line += " {:>10.4f} s {:>9.1f} MB".format(row["seconds"], row["peak_mb"])
+    if "expanded_per_s" in row:
+        line += " {:>12.0f} nodes/s".format(row["expanded_per_s"])
+    print(line)
+
+
+if __name__=="__main__":
+    parser = argparse.ArgumentParser(description="Search scaling benchmark")
+    parser.add_argument("--kind", choices=["grid", "geometric"],
+            default="grid")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--queries", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--heuristics-max", type=int, default=2000,
+            help="largest size to write an all pairs heuristics file for, "
+                 "landmarks are used above it")
+    parser.add_argument("--out", help="keep the generated graphs here")
+    parser.add_argument("--csv", help="also write the results to this csv")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        out_dir = args.out or tmp_dir
+        results = []
+        for n in args.sizes:
+            for row in bench_size(args.kind, n, out_dir, args.queries,
+                    args.seed, args.heuristics_max):
+                print_row(row)
+                results.append(row)
+
+    if args.csv:
+        fields = ["kind", "nodes", "edges", "operation", "queries", "seconds",
+                "expanded", "expanded_per_s", "peak_mb"]
+        with open(args.csv, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows(results)
@@ -0,0 +1,209 @@
+#-------------------------------------------#
+#       Synthetic graph generator           #
+#-------------------------------------------#
+# Writes grid or random geometric graphs in the csv formats the search
+# scripts read:
+#   edgeweights  From,To,Weight rows like ASTAR/EdgeWeights.csv
+#   adjacency    one padded row per node like BFS_DFS/BFS_DFS.csv
+#   heuristics   all pairs upper triangle like ASTAR/minCosts.csv
+# nodes are labelled 1..n and every edge is written in both directions
+
+import argparse
+import csv
+import math
+import os
+import random
+from array import array
+
+MASK64 = (1 << 64) - 1
+
+
+def edge_noise(u, v, seed):
+    """ Deterministic noise in [0, 1) for the undirected edge u-v, so both
+    directions get the same weight without storing the edges (splitmix64)
+    params:
+        u, v: int, node ids
+        seed: int, generator seed
+    """
+    if v < u:
+        u, v = v, u
+    z = (u * 0x9E3779B97F4A7C15 + v * 0xBF58476D1CE4E5B9 + seed) & MASK64
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & MASK64
+    z ^= z >> 31
+    return (z >> 11) / float(1 << 53)
+
+
+def edge_weight(length, noise):
+    """ Weight of an edge of the given straight line length, rounded up to
+    one decimal like the bundled data so it never drops below the length
+    and the straight line distance stays an admissible heuristic
+    """
+    return math.ceil(length * (1 + noise) * 10) / 10
+
+
+class GridGraph():
+    """ 4-neighbour grid of n nodes, filled row by row
+    params:
+        n: int, number of nodes
+        seed: int, seed for the edge weights
+    methods:
+        position: (x, y) of a node id
+        neighbors: (node id, weight) pairs of a node id
+    """
+    def __init__(self, n, seed=0):
+        self.n = n
+        self.seed = seed
+        self.cols = max(1, math.ceil(math.sqrt(n)))
+
+    def position(self, u):
+        return u % self.cols, u // self.cols
+
+    def neighbors(self, u):
+        cols = self.cols
+        result = []
+        for v in (u - cols, u - 1, u + 1, u + cols):
+            if 0 <= v < self.n and (v // cols == u // cols or v % cols == u % cols):
+                result.append((v, edge_weight(1, edge_noise(u, v, self.seed))))
+        return result
+
+
+class GeometricGraph():
+    """ Random geometric graph, n points placed uniformly at density one and
+    every pair closer than the radius giving the average degree is joined
+    params:
+        n: int, number of nodes
+        seed: int, seed for the points and edge weights
+        degree: float, expected average degree
+    methods:
+        position: (x, y) of a node id
+        neighbors: (node id, weight) pairs of a node id
+    """
+    def __init__(self, n, seed=0, degree=6):
+        self.n = n
+        self.seed = seed
+        self.radius = math.sqrt(degree / math.pi)
+        side = math.sqrt(n)
+        rng = random.Random(seed)
+        self.xs = array('d', (rng.uniform(0, side) for _ in range(n)))
+        self.ys = array('d', (rng.uniform(0, side) for _ in range(n)))
+
+        # bucket the points into radius sized cells so each neighbor
+        # lookup only checks the 3x3 cells around a point
+        self.cells = max(1, int(side / self.radius))
+        self.cell_size = side / self.cells
+        self.buckets = {}
+        for u in range(n):
+            self.buckets.setdefault(self._cell(u), []).append(u)
+
+    def _cell(self, u):
+        return (min(int(self.xs[u] / self.cell_size), self.cells - 1),
+                min(int(self.ys[u] / self.cell_size), self.cells - 1))
+
+    def position(self, u):
+        return self.xs[u], self.ys[u]
+
+    def neighbors(self, u):
+        cx, cy = self._cell(u)
+        x, y = self.xs[u], self.ys[u]
+        result = []
+        for bx in range(cx - 1, cx + 2):
+            for by in range(cy - 1, cy + 2):
+                for v in self.buckets.get((bx, by), ()):
+                    length = math.hypot(self.xs[v] - x, self.ys[v] - y)
+                    if v != u and length <= self.radius:
+                        result.append((v, edge_weight(length,
+                                edge_noise(u, v, self.seed))))
+        result.sort()
+        return result
+
+
+def make_graph(kind, n, seed=0):
+    """ Builds a generator graph of the given kind, grid or geometric """
+    if kind == "grid":
+        return GridGraph(n, seed)
+    if kind == "geometric":
+        return GeometricGraph(n, seed)
+    raise ValueError("unknown graph kind " + str(kind))
+
+
+def write_edgeweights(graph, file_name):
+    """ Writes From,To,Weight rows sorted by From like EdgeWeights.csv """
+    with open(file_name, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(["From", "To", "Weight"])
+        for u in range(graph.n):
+            for v, weight in graph.neighbors(u):
+                writer.writerow([u + 1, v + 1, weight])
+
+
+def write_adjacency(graph, file_name):
+    """ Writes one row per node like BFS_DFS.csv, the node itself first
+    then its neighbors, padded with blank cells to the widest row
+    """
+    width = 0
+    for u in range(graph.n):
+        width = max(width, len(graph.neighbors(u)) + 1)
+    with open(file_name, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(["From", "To"] + [""] * (width - 2))
+        for u in range(graph.n):
+            row = [u + 1] + [v + 1 for v, _ in graph.neighbors(u)]
+            writer.writerow(row + [""] * (width - len(row)))
+
+
+def write_heuristics(graph, file_name):
+    """ Writes the straight line distance between every pair in the
+    minCosts.csv layout, rounded down so it stays admissible, this is
+    O(n^2) so only sensible for small graphs
+    """
+    n = graph.n
+    with open(file_name, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(["min costs", "ALL shortest paths min costs"]
+                + [""] * (n - 1))
+        writer.writerow([""] * (n + 1))
+        writer.writerow([""] * (n + 1))
+        writer.writerow(["", "TO"] + [""] * (n - 1))
+        writer.writerow(["FROM"] + list(range(1, n + 1)))
+        for u in range(n):
+            x, y = graph.position(u)
+            row = [u + 1] + [0] * (u + 1)
+            for v in range(u + 1, n):
+                vx, vy = graph.position(v)
+                row.append(math.floor(math.hypot(vx - x, vy - y) * 10) / 10)
+            writer.writerow(row)
+
+
+def generate(kind, n, out_dir, seed=0, heuristics=True):
+    """ Writes all three csv files for one graph into out_dir
+    returns:
+        dict of the file names written, heuristics is None when skipped
+    """
+    graph = make_graph(kind, n, seed)
+    stem = os.path.join(out_dir, kind + "_" + str(n))
+    files = {
+        "edgeweights": stem + "_edgeweights.csv",
+        "adjacency": stem + "_adjacency.csv",
+        "heuristics": stem + "_heuristics.csv" if heuristics else None,
+    }
+    write_edgeweights(graph, files["edgeweights"])
+    write_adjacency(graph, files["adjacency"])
+    if heuristics:
+        write_heuristics(graph, files["heuristics"])
+    return files
+
+
+if __name__=="__main__":
+    parser = argparse.ArgumentParser(description="Synthetic graph generator")
+    parser.add_argument("kind", choices=["grid", "geometric"])
+    parser.add_argument("nodes", type=int)
+    parser.add_argument("--out", default=".")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-heuristics", action="store_true",
+            help="skip the O(n^2) heuristics file")
+    args = parser.parse_args()
+    for name, file_name in generate(args.kind, args.nodes, args.out, args.seed,
+            not args.no_heuristics).items():
+        if file_name:
+            print(name + ": " + file_name)
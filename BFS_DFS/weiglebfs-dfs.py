@@ -5,112 +5,67 @@
 #    Breadth-first vs Depth-first Search    #
 #-------------------------------------------#
 
-import csv
-import queue
+import weiglej_search
 
-sm = int(input("Please pick search method BFS(1) or DFS(2): "))
-while(sm != 1 and sm != 2):
-    print("Search method choices are 1 or 2")
-    sm = int(input("Please pick BFS(1) or DFS(2): "))
 
-sn = int(input("Please enter the starting node (1-200): "))
-while(sn < 1 or 200 < sn or type(sn) != int):
-    print("Starting node not integer from 1-200")
-    sn = int(input("Please enter the starting node (1-200): "))
-
-en = int(input("Please enter the ending node (1-200): "))
-while(en < 1 or 200 < en or type(en) != int):
-    print("Ending node not integer from 1-200")
-    en = int(input("Please enter the ending node (1-200): "))
-
-
-fn = input("Please enter a csv filename: ")
-fn = fn + ".csv"
-#fn = "BFS_DFS.csv"
-
-
-# Breadth-first search algorithm
-def bfs(csv_data, cn, visited = None):
-    q = queue.Queue()
-    if(visited is None):
-        visited = []
-    q.put(cn)
-    while q:
-        cn = q.get()
-        if cn == en:
-            return visited
-        for n in csv_data[int(cn)]:
-            if n not in visited:
-                visited.append(n)
-                q.put(int(n))
-
-
-# Depth-first search algorithm
-def dfs(csv_data, cn, visited = None): 
-    if(visited is None):
-        visited = []
+# Prints a path found by a search
+def print_path(path):
+    if(path):
+        print(" - ".join(str(i) for i in path))
     else:
-        visited.append(cn)
+        print("No path between nodes")
 
-    for n in csv_data[int(cn)]:
-        if n not in visited:
-            # recursively calls dfs to create stack
-            visited = dfs(csv_data, n, visited)
-        
-    return visited
 
-
-# Calls search method bfs or dfs if startnode != endnode
-def check_start_end():
+# Calls search method bfs, dfs or bidirectional bfs if startnode != endnode
+def check_start_end(adj, radj, conn, sm, sn, en):
     if(sn == en):
         print("Path = " + str(sn))
+    elif(not conn.connected(sn, en)):
+        # different components, no search needed
+        print("No path between nodes")
     else:
         if(sm == 1):
             print("USING BFS")
-            traversal = bfs(csv_data, sn)
-            print("BFS traversal")
-            path = ''
-            found = False
-            for i in traversal:
-                path = path + str(i) + " - "
-                if(int(i) == en):
-                    found = True
-                    path = path.rstrip("- ")
-                    break
-            if(found):
-                print(path)
-            else:
-                print("No path between nodes")
+            path = weiglej_search.bfs(adj, sn, en)
+            print("BFS shortest path")
+            print_path(path)
 
         if(sm == 2):
             print("USING DFS")
-            traversal = dfs(csv_data, sn)
-            print("DFS traversal")
-            path = ''
-            found = False
-            for i in traversal:
-                path = path + str(i) + " - "
-                if(int(i) == en):
-                    found = True
-                    path = path.rstrip("- ") 
-                    break
-            if(found):
-                print(path)
-            else:
-                print("No path between nodes")
+            path = weiglej_search.dfs(adj, sn, en)
+            print("DFS path")
+            print_path(path)
+
+        if(sm == 3):
+            print("USING BIDIRECTIONAL BFS")
+            path = weiglej_search.bidirectional_bfs(adj, radj, sn, en)
+            print("Bidirectional BFS shortest path")
+            print_path(path)
 
-# Open the file
-f = open(fn, 'r')
-reader = csv.reader(f)
-csv_data = []
-for row in reader:
-    csv_data.append(row)
 
-# Remove the blanks from the csv
-for row in csv_data:
-    blankcount = row.count('')
-    for i in range(0, blankcount):
-        row.pop()
+if __name__=="__main__":
+    sm = int(input("Please pick search method BFS(1), DFS(2) "
+            "or bidirectional BFS(3): "))
+    while(sm != 1 and sm != 2 and sm != 3):
+        print("Search method choices are 1, 2 or 3")
+        sm = int(input("Please pick BFS(1), DFS(2) or bidirectional BFS(3): "))
 
-# Start program
-check_start_end()
+    sn = int(input("Please enter the starting node (1-200): "))
+    while(sn < 1 or 200 < sn or type(sn) != int):
+        print("Starting node not integer from 1-200")
+        sn = int(input("Please enter the starting node (1-200): "))
+
+    en = int(input("Please enter the ending node (1-200): "))
+    while(en < 1 or 200 < en or type(en) != int):
+        print("Ending node not integer from 1-200")
+        en = int(input("Please enter the ending node (1-200): "))
+
+    fn = input("Please enter a csv filename: ")
+    fn = fn + ".csv"
+    #fn = "BFS_DFS.csv"
+
+    # Start program
+    adj = weiglej_search.get_adjacency(fn)
+    radj = adj.reversed()
+    conn = weiglej_search.get_connectivity(fn, adj)
+    check_start_end(adj, radj, conn, sm, sn, en)
@@ -0,0 +1,122 @@
+#-------------------------------------------#
+#       Level-synchronous BFS               #
+#-------------------------------------------#
+# Whole graph BFS over a SciPy CSR matrix, every level is expanded with
+# vectorized sparse row gathers instead of a per node Python loop and the
+# search switches between top-down and bottom-up expansion depending on
+# the size of the frontier (direction-optimizing BFS), e.g.
+#   python weiglej_levelbfs.py BFS_DFS.csv 3
+
+import sys
+
+import numpy as np
+import scipy.sparse as sp
+
+import weiglej_search
+
+# direction switching thresholds from Beamer et al., go bottom-up once the
+# frontier's edges exceed 1/ALPHA of the unvisited nodes' edges and back
+# top-down once the frontier has fewer than 1/BETA of the nodes
+ALPHA = 14
+BETA = 24
+
+
+def to_csr_matrix(adj):
+    """ Sparse matrix of an Adjacency, A[u, v] is set for an edge u to v,
+    the index arrays are shared with the adjacency instead of copied
+    params:
+        adj: weiglej_search.Adjacency
+    returns:
+        scipy.sparse.csr_matrix of shape (n, n)
+    """
+    n = len(adj)
+    indptr = np.frombuffer(adj.offsets, dtype=np.int64)
+    indices = np.frombuffer(adj.targets, dtype=np.int32)
+    data = np.ones(len(indices), dtype=np.bool_)
+    return sp.csr_matrix((data, indices, indptr), shape=(n, n))
+
+
+def _gather(matrix, rows):
+    """ Column indices of the given rows of a CSR matrix plus, for each
+    entry, the position of its row in rows
+    """
+    indptr = matrix.indptr
+    starts = indptr[rows]
+    counts = indptr[rows + 1] - starts
+    total = int(counts.sum())
+    if total == 0:
+        return np.empty(0, dtype=matrix.indices.dtype), np.empty(0, np.int64)
+    row_of = np.repeat(np.arange(len(rows)), counts)
+    # entry k of row r sits at starts[r] + (k - first entry of r)
+    firsts = np.cumsum(counts) - counts
+    entries = starts[row_of] + (np.arange(total) - firsts[row_of])
+    return matrix.indices[entries], row_of
+
+
+def level_bfs(A, source, AT=None):
+    """ Direction-optimizing level-synchronous BFS from source
+    params:
+        A: scipy.sparse.csr_matrix, A[u, v] set for an edge u to v
+        source: int, node id to start from
+        AT: transpose of A in CSR form, optional, built when needed
+    returns:
+        distance array, -1 for unreachable nodes,
+        parent array, -1 for unreachable nodes and source for itself
+    """
+    n = A.shape[0]
+    if AT is None:
+        AT = A.T.tocsr()
+    out_degree = np.diff(A.indptr)
+    dist = np.full(n, -1, dtype=np.int32)
+    parent = np.full(n, -1, dtype=np.int32)
+    dist[source] = 0
+    parent[source] = source
+    frontier = np.array([source], dtype=np.int64)
+    unvisited_edges = int(out_degree.sum()) - int(out_degree[source])
+    bottom_up = False
+    level = 0
+    while len(frontier):
+        level += 1
+        frontier_edges = int(out_degree[frontier].sum())
+        if not bottom_up and frontier_edges > unvisited_edges / ALPHA:
+            bottom_up = True
+        elif bottom_up and len(frontier) < n / BETA:
+            bottom_up = False
+
+        if bottom_up:
+            # every unvisited node looks for any parent in the frontier
+            in_frontier = np.zeros(n, dtype=np.bool_)
+            in_frontier[frontier] = True
+            candidates = np.flatnonzero(dist < 0)
+            sources, row_of = _gather(AT, candidates)
+            hit = in_frontier[sources]
+            rows, first = np.unique(row_of[hit], return_index=True)
+            found = candidates[rows]
+            parent[found] = sources[hit][first]
+        else:
+            # the frontier pushes to its unvisited neighbors, the first
+            # frontier node to reach a neighbor becomes its parent
+            targets, row_of = _gather(A, frontier)
+            fresh = dist[targets] < 0
+            found, first = np.unique(targets[fresh], return_index=True)
+            parent[found] = frontier[row_of[fresh][first]]
+
+        dist[found] = level
+        unvisited_edges -= int(out_degree[found].sum())
+        frontier = found.astype(np.int64)
+
+    return dist, parent
+
+
+if __name__=="__main__":
+    fn = sys.argv[1]
+    source = int(sys.argv[2])
+    adj = weiglej_search.get_adjacency(fn)
+    dist, parent = level_bfs(to_csr_matrix(adj), source)
+    reached = dist >= 0
+    # id 0 is the unused header row of the csv
+    print("Reachable nodes: " + str(int(reached[1:].sum())))
+    print("Eccentricity: " + str(int(dist.max())))
+    levels = np.bincount(dist[reached])
+    for level in range(len(levels)):
+        print("Distance " + str(level) + ": " + str(levels[level]) + " nodes")
@@ -0,0 +1,413 @@
+#-------------------------------------------#
+#       Graph search library                #
+#-------------------------------------------#
+# Searches over a preloaded integer adjacency, no prompts or globals so
+# the functions can be imported, reused and benchmarked
+
+import os
+import struct
+import sys
+import zlib
+from array import array
+from collections import deque
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+        '..', 'GRAPH'))
+from weiglej_graphstore import adjacency_rows
+import weiglej_graphstore
+
+
+class Adjacency():
+    """ Integer adjacency of a BFS_DFS style csv in compressed sparse row
+    form, node ids are the integer labels of the csv so id 0 is unused
+    params:
+        offsets: array, neighbors of node u are offsets[u] to offsets[u+1]
+        targets: array, neighbor node ids
+    methods:
+        neighbors: node ids next to a node
+        reversed: Adjacency with every edge turned around
+    """
+    def __init__(self, offsets, targets):
+        self.offsets = offsets
+        self.targets = targets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def neighbors(self, u):
+        return self.targets[self.offsets[u]:self.offsets[u+1]]
+
+    def reversed(self):
+        n = len(self)
+        offsets = array('q', bytes(8 * (n + 1)))
+        for v in self.targets:
+            offsets[v+1] += 1
+        for u in range(n):
+            offsets[u+1] += offsets[u]
+        fill = array('q', offsets)
+        targets = array('i', bytes(4 * len(self.targets)))
+        for u in range(n):
+            for v in self.targets[self.offsets[u]:self.offsets[u+1]]:
+                targets[fill[v]] = u
+                fill[v] += 1
+        return Adjacency(offsets, targets)
+
+
+def get_adjacency(fn):
+    """ Reads a BFS_DFS style csv, each row is a node followed by its
+    neighbors and padded with blank cells, through the compiled graph
+    store so the csv is only parsed when the store is missing or stale
+    params:
+        fn: str, csv file name
+    returns:
+        Adjacency of the file
+    """
+    g = weiglej_graphstore.load_graph(fn, weiglej_graphstore.ADJACENCY)
+    return Adjacency(g.offsets, g.targets)
+
+
+def reconstruct_path(parent, end):
+    """ Walks the parent array back from end to the start of the search
+    params:
+        parent: array, node each node was discovered from, the start of
+                    the search is its own parent
+        end: int, node id the path ends at
+    returns:
+        list of node ids from the start to end
+    """
+    path = [end]
+    while parent[end] != end:
+        end = parent[end]
+        path.append(end)
+    path.reverse()
+    return path
+
+
+def bfs(adj, start, end, stats=None):
+    """ Breadth-first search for the shortest path by edge count
+    params:
+        adj: Adjacency
+        start: int, starting node id
+        end: int, ending node id
+        stats: dict, optional, the number of nodes the search reached is
+                    added to its "expanded" count
+    returns:
+        list of node ids from start to end, False if there is no path
+    """
+    offsets = adj.offsets
+    targets = adj.targets
+    visited = bytearray(len(adj))
+    parent = array('i', bytes(4 * len(adj)))
+    visited[start] = 1
+    parent[start] = start
+    q = deque([start])
+    path = False
+    while q:
+        u = q.popleft()
+        if u == end:
+            path = reconstruct_path(parent, end)
+            break
+        for v in targets[offsets[u]:offsets[u+1]]:
+            if not visited[v]:
+                visited[v] = 1
+                parent[v] = u
+                q.append(v)
+    if stats is not None:
+        stats["expanded"] = stats.get("expanded", 0) + visited.count(1)
+    return path
+
+
+def dfs(adj, start, end, stats=None):
+    """ Depth-first search with an explicit stack, nodes are visited in the
+    same order as the recursive version but the Python stack stays flat
+    params:
+        adj: Adjacency
+        start: int, starting node id
+        end: int, ending node id
+        stats: dict, optional, the number of nodes the search reached is
+                    added to its "expanded" count
+    returns:
+        list of node ids on the search stack from start to end when end was
+        discovered, False if there is no path
+    """
+    offsets = adj.offsets
+    targets = adj.targets
+    visited = bytearray(len(adj))
+    visited[start] = 1
+    # stack holds the current path, edge the next edge to try at each level
+    stack = [start]
+    edge = [offsets[start]]
+    path = [start] if start == end else False
+    while stack and not path:
+        u = stack[-1]
+        e = edge[-1]
+        last = offsets[u+1]
+        while e < last and visited[targets[e]]:
+            e += 1
+        if e == last:
+            stack.pop()
+            edge.pop()
+            continue
+        edge[-1] = e + 1
+        v = targets[e]
+        visited[v] = 1
+        stack.append(v)
+        edge.append(offsets[v])
+        if v == end:
+            path = stack
+    if stats is not None:
+        stats["expanded"] = stats.get("expanded", 0) + visited.count(1)
+    return path
+
+
+def bidirectional_bfs(adj, radj, start, end, stats=None):
+    """ Breadth-first search from both ends that meets in the middle, each
+    step expands a whole level of whichever frontier is smaller, the first
+    meeting already gives a shortest path since no earlier level met
+    params:
+        adj: Adjacency
+        radj: Adjacency, adj reversed, searched from the ending node
+        start: int, starting node id
+        end: int, ending node id
+        stats: dict, optional, the number of nodes the search reached is
+                    added to its "expanded" count
+    returns:
+        list of node ids from start to end, False if there is no path
+    """
+    # side marks which search reached a node, 1 from start and 2 from end,
+    # parent points back towards the start or the end of that search
+    side = bytearray(len(adj))
+    parent = array('i', bytes(4 * len(adj)))
+    side[start] = 1
+    side[end] = 2
+    parent[start] = start
+    parent[end] = end
+    frontiers = {1: [start], 2: [end]}
+    meet = None
+    if start == end:
+        meet = (start, start)
+    while meet is None and frontiers[1] and frontiers[2]:
+        this = 1 if len(frontiers[1]) <= len(frontiers[2]) else 2
+        other = 3 - this
+        edges = adj if this == 1 else radj
+        offsets = edges.offsets
+        targets = edges.targets
+        level = []
+        for u in frontiers[this]:
+            for v in targets[offsets[u]:offsets[u+1]]:
+                if side[v] == other:
+                    meet = (u, v) if this == 1 else (v, u)
+                    break
+                if not side[v]:
+                    side[v] = this
+                    parent[v] = u
+                    level.append(v)
+            if meet is not None:
+                break
+        frontiers[this] = level
+
+    if stats is not None:
+        stats["expanded"] = (stats.get("expanded", 0)
+                + len(side) - side.count(0))
+    if meet is None:
+        return False
+    # meet is an edge (a, b) with a reached from start and b from end
+    a, b = meet
+    path = reconstruct_path(parent, a)
+    if a != b:
+        path.append(b)
+        while b != parent[b]:
+            b = parent[b]
+            path.append(b)
+    return path
+
+
+class Connectivity():
+    """ Union-find over node ids, two nodes in different components can
+    never reach each other so such queries are answered without a search,
+    for directed input these are the weakly connected components so a
+    shared component still needs a search to confirm the path
+    params:
+        parent: array, union-find parent of each node id
+    methods:
+        find: root node id of the component of a node
+        connected: whether two nodes share a component
+        add_edge: merge the components of the two ends of a new edge
+    """
+    def __init__(self, parent):
+        self.parent = parent
+
+    def __len__(self):
+        return len(self.parent)
+
+    def _grow(self, n):
+        if n > len(self.parent):
+            self.parent.extend(range(len(self.parent), n))
+
+    def find(self, u):
+        parent = self.parent
+        if u >= len(parent):
+            return u
+        root = u
+        while parent[root] != root:
+            root = parent[root]
+        # path compression
+        while parent[u] != root:
+            parent[u], u = root, parent[u]
+        return root
+
+    def connected(self, u, v):
+        return self.find(u) == self.find(v)
+
+    def add_edge(self, u, v):
+        self._grow(max(u, v) + 1)
+        ru = self.find(u)
+        rv = self.find(v)
+        if ru != rv:
+            # the smaller id becomes the root so roots stay stable
+            if rv < ru:
+                ru, rv = rv, ru
+            self.parent[rv] = ru
+
+    def flatten(self):
+        """ Points every node straight at its root so find is one step """
+        for u in range(len(self.parent)):
+            self.find(u)
+
+
+def build_connectivity(adj):
+    """ Union-find components of every edge in an Adjacency
+    params:
+        adj: Adjacency
+    returns:
+        Connectivity with every node pointing straight at its root
+    """
+    conn = Connectivity(array('i', range(len(adj))))
+    offsets = adj.offsets
+    targets = adj.targets
+    for u in range(len(adj)):
+        for v in targets[offsets[u]:offsets[u+1]]:
+            conn.add_edge(u, v)
+    conn.flatten()
+    return conn
+
+
+CONNECTIVITY_MAGIC = b'CONN'
+CONNECTIVITY_VERSION = 2
+# magic, version, nodes, crc32 and size of the covered csv, csv mtime
+CONNECTIVITY_HEADER = struct.Struct('<4sIIIqq')
+
+
+def connectivity_file_name(fn):
+    """ Component index file that sits next to the adjacency csv """
+    return os.path.splitext(fn)[0] + '.components.bin'
+
+
+def write_connectivity(conn, index_fn, size, crc, mtime_ns):
+    """ Saves the component of every node, stamped with how many bytes of
+    the csv it covers and their crc32 so appended rows can be detected,
+    and the csv's modification time so an unchanged csv is not read
+    params:
+        conn: Connectivity
+        index_fn: str, file to write
+        size: int, bytes of the csv covered by the index
+        crc: int, crc32 of those bytes
+        mtime_ns: int, st_mtime_ns of the csv when it was read
+    """
+    conn.flatten()
+    header = CONNECTIVITY_HEADER.pack(CONNECTIVITY_MAGIC,
+            CONNECTIVITY_VERSION, len(conn), crc, size, mtime_ns)
+    tmp_fn = index_fn + '.tmp'
+    with open(tmp_fn, 'wb') as f:
+        f.write(header)
+        f.write(conn.parent.tobytes())
+    os.replace(tmp_fn, index_fn)
+
+
+def read_connectivity(index_fn):
+    """ Loads a saved component index
+    returns:
+        (Connectivity, csv bytes covered, crc32 of them, csv mtime), or
+        None if the file is missing or not an index
+    """
+    try:
+        f = open(index_fn, 'rb')
+    except FileNotFoundError:
+        return None
+    with f:
+        header = f.read(CONNECTIVITY_HEADER.size)
+        if len(header) < CONNECTIVITY_HEADER.size:
+            return None
+        magic, version, n, crc, size, mtime_ns = (
+                CONNECTIVITY_HEADER.unpack(header))
+        if magic != CONNECTIVITY_MAGIC or version != CONNECTIVITY_VERSION:
+            return None
+        parent = array('i')
+        parent.frombytes(f.read(4 * n))
+    return Connectivity(parent), size, crc, mtime_ns
+
+
+def file_crc32(f, size=None, chunk=1 << 20):
+    """ crc32 of the next size bytes of an open binary file, or up to the
+    end of it, read in chunks
+    returns:
+        (crc32, number of bytes read)
+    """
+    crc = 0
+    done = 0
+    while size is None or done < size:
+        block = f.read(chunk if size is None else min(chunk, size - done))
+        if not block:
+            break
+        crc = zlib.crc32(block, crc)
+        done += len(block)
+    return crc, done
+
+
+def get_connectivity(fn, adj=None):
+    """ Loads the component index of an adjacency csv, the csv is not read
+    while its size and modification time match the index, rows appended
+    to it since the index was saved are merged in without a rebuild, any
+    other change rebuilds it from the whole file
+    params:
+        fn: str, adjacency csv
+        adj: Adjacency of fn, optional, saves parsing the csv on a rebuild
+    returns:
+        Connectivity
+    """
+    index_fn = connectivity_file_name(fn)
+    # stat before reading so a change made meanwhile leaves a stale stamp
+    st = os.stat(fn)
+    saved = read_connectivity(index_fn)
+    if saved is not None:
+        conn, size, crc, mtime_ns = saved
+        if st.st_size == size and st.st_mtime_ns == mtime_ns:
+            return conn
+    if saved is not None and st.st_size >= size:
+        # crc only the part the index covers, a touched csv of the same
+        # size just gets a new stamp
+        with open(fn, 'rb') as f:
+            if file_crc32(f, size) == (crc, size):
+                tail = f.read()
+                # only new rows at the end, union their edges in
+                for u, neighbors in adjacency_rows(
+                        tail.decode().splitlines()):
+                    for v in neighbors:
+                        conn.add_edge(u, v)
+                try:
+                    write_connectivity(conn, index_fn, size + len(tail),
+                            zlib.crc32(tail, crc), st.st_mtime_ns)
+                except OSError:
+                    pass
+                return conn
+
+    if adj is None:
+        adj = get_adjacency(fn)
+    conn = build_connectivity(adj)
+    with open(fn, 'rb') as f:
+        crc, size = file_crc32(f)
+    try:
+        write_connectivity(conn, index_fn, size, crc, st.st_mtime_ns)
+    except OSError:
+        pass
+    return conn
@@ -0,0 +1,43 @@
+#---------------------------------------#
+#       Island model GA tests           #
+#---------------------------------------#
+# The incrementally updated evals of islands that trade migrants must
+# match a fresh evaluation of the same genomes, run with
+#   python -m pytest GENALG
+
+import numpy as np
+
+import weiglej_islands
+import weiglej_population
+
+# far corner of the playground so the islands keep evolving
+GOAL = [31, 17]
+
+
+def fresh_evals(population, start, goal, playground):
+    """ Evals of the genomes of a population calculated from scratch """
+    fresh = weiglej_population.Population(population.alphas.copy())
+    fresh.hunt(start)
+    fresh.evaluate(goal, playground)
+    return fresh.evals
+
+
+def test_settled_migrants_are_evaluated_again():
+    rng = np.random.default_rng(0)
+    opts = dict(weiglej_population.OPTS, PopulationSize=60)
+    islands = [weiglej_population.gen_population(rng, opts)
+            for i in range(2)]
+    start = weiglej_population.START
+    playground = weiglej_population.PLAYGROUND
+    for generation in range(100):
+        for population in islands:
+            population.hunt(start)
+            population.evaluate(GOAL, playground)
+            np.testing.assert_array_equal(population.evals,
+                    fresh_evals(population, start, GOAL, playground))
+        if generation % 2 == 0:
+            a, b = islands
+            weiglej_islands._settle(a, *weiglej_islands._migrants(b, 10))
+            weiglej_islands._settle(b, *weiglej_islands._migrants(a, 10))
+        islands = [weiglej_population.next_generation(rng, population, opts)
+                for population in islands]
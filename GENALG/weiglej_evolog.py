@@ -0,0 +1,173 @@
+#---------------------------------------#
+#       GA evolution log                #
+#---------------------------------------#
+# Records the paths of every generation of a GA run into an append-only
+# binary file of float32 arrays and replays it afterwards, one
+# LineCollection per generation, so runs go at full speed and are
+# watched later, e.g.
+#   python weiglej_population.py --seed 1 --log run.bin
+#   python weiglej_evolog.py run.bin --every 2 --save run.gif
+# the file is a header followed by one record per logged generation, a
+# record header then (snakes, MaxSteps + 1, 2) float32 locations of the
+# paths including the start, a record cut short by a crash is ignored
+
+import argparse
+import mmap
+import struct
+
+import numpy as np
+
+LOG_MAGIC = b'GEVO'
+LOG_VERSION = 1
+# magic, version, points per path, goal x, goal y, xmin, xmax, ymin, ymax
+LOG_HEADER = struct.Struct('<4sII6d')
+# generation, snakes, closest distance
+RECORD_HEADER = struct.Struct('<iif')
+
+
+class EvolutionLog():
+    """ Append-only writer of the paths of each generation
+    params:
+        fn: str, file to create
+        steps: int, MaxSteps of the run
+        goal: list, [x, y]
+        playground: list of 2 tuples, [x(min, max), y(min, max)]
+        max_snakes: int, only the first max_snakes paths of a generation
+                    are kept, all of them when None
+    methods:
+        append: records the paths of a generation
+        close: closes the file
+    """
+    def __init__(self, fn, steps, goal, playground, max_snakes=None):
+        self.points = steps + 1
+        self.max_snakes = max_snakes
+        self.f = open(fn, 'wb')
+        self.f.write(LOG_HEADER.pack(LOG_MAGIC, LOG_VERSION, self.points,
+                goal[0], goal[1], playground[0][0], playground[0][1],
+                playground[1][0], playground[1][1]))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def append(self, generation, paths, best=float('nan')):
+        """ Records one generation
+        params:
+            generation: int, generation number
+            paths: float array or nested lists (snakes, MaxSteps + 1, 2),
+                        locations of each path starting with the start
+            best: float, closest distance of the generation
+        """
+        paths = np.asarray(paths)
+        if self.max_snakes is not None:
+            paths = paths[:self.max_snakes]
+        if paths.shape[1:] != (self.points, 2):
+            raise ValueError("paths of shape " + str(paths.shape)
+                    + " do not have " + str(self.points) + " points")
+        self.f.write(RECORD_HEADER.pack(generation, len(paths), best))
+        self.f.write(np.ascontiguousarray(paths, dtype=np.float32))
+
+    def close(self):
+        self.f.close()
+
+
+def read_log(fn):
+    """ Memory maps a log, the paths are float32 views of the mapped pages
+    params:
+        fn: str, log file
+    returns:
+        dict with goal, playground and points,
+        list of (generation, closest distance, paths) per record
+    """
+    with open(fn, 'rb') as f:
+        header = f.read(LOG_HEADER.size)
+        if len(header) < LOG_HEADER.size:
+            raise ValueError(fn + " is not an evolution log")
+        magic, version, points, gx, gy, x0, x1, y0, y1 = (
+                LOG_HEADER.unpack(header))
+        if magic != LOG_MAGIC or version != LOG_VERSION:
+            raise ValueError(fn + " is not a version " + str(LOG_VERSION)
+                    + " evolution log")
+        size = f.seek(0, 2)
+        mm = None
+        if size > LOG_HEADER.size:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    info = {
+        "goal": (gx, gy),
+        "playground": [(x0, x1), (y0, y1)],
+        "points": points,
+    }
+
+    records = []
+    offset = LOG_HEADER.size
+    while mm is not None and offset + RECORD_HEADER.size <= size:
+        generation, snakes, best = RECORD_HEADER.unpack_from(mm, offset)
+        offset += RECORD_HEADER.size
+        count = snakes * points * 2
+        if offset + 4 * count > size:
+            break
+        paths = np.frombuffer(mm, np.float32, count, offset)
+        records.append((generation, best, paths.reshape(snakes, points, 2)))
+        offset += 4 * count
+    return info, records
+
+
+def render(fn, every=1, interval=50, save=None):
+    """ Replays a log with one LineCollection per generation
+    params:
+        fn: str, log file
+        every: int, draw every n-th generation, the last is always drawn
+        interval: int, milliseconds between frames
+        save: str, write the animation to this file instead of showing it,
+                    the writer is picked from the extension
+    """
+    import matplotlib.pyplot as plt
+    from matplotlib.animation import FuncAnimation
+    from matplotlib.collections import LineCollection
+
+    info, records = read_log(fn)
+    if not records:
+        raise ValueError(fn + " has no generations")
+    frames = list(range(0, len(records), every))
+    if frames[-1] != len(records) - 1:
+        frames.append(len(records) - 1)
+
+    fig = plt.figure()
+    ax = fig.add_subplot(111)
+    (x0, x1), (y0, y1) = info["playground"]
+    ax.set_xlim(left = x0, right = x1)
+    ax.set_ylim(bottom = y0, top = y1)
+    ax.plot(*info["goal"], marker='*', color='r', markersize=12)
+    lines = LineCollection([], colors='g', linewidths=0.5)
+    ax.add_collection(lines)
+    title = ax.set_title("")
+
+    def draw(i):
+        generation, best, paths = records[i]
+        lines.set_segments(paths)
+        title.set_text("Generation " + str(generation)
+                + ", closest " + "%.3f" % best)
+        return lines, title
+
+    anim = FuncAnimation(fig, draw, frames=frames, interval=interval,
+            repeat=False)
+    if save:
+        anim.save(save)
+    else:
+        plt.show()
+    return anim
+
+
+if __name__=="__main__":
+    parser = argparse.ArgumentParser(description="Replay a GA evolution log")
+    parser.add_argument("log")
+    parser.add_argument("--every", type=int, default=1,
+            help="draw every n-th generation")
+    parser.add_argument("--interval", type=int, default=50,
+            help="milliseconds between frames")
+    parser.add_argument("--save", default=None,
+            help="write the animation to a file, e.g. run.gif")
+    args = parser.parse_args()
+    render(args.log, args.every, args.interval, args.save)
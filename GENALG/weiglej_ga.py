@@ -9,10 +9,19 @@ import random
 from math import cos, sin, pi, hypot, inf
 import operator
 
-#imports for animation
-import matplotlib.pyplot as plt
-
-USE_ANIMATION = False # for deciding whether to animate or not
+import weiglej_metrics
+
+# the snake problem and hyperparameters ga_soln_snakes uses by default
+PLAYGROUND = [(0,32), (0,18)]
+START = [5, 1]
+GOAL = [21, 13]
+OPTS = {
+    "PopulationSize": 50,
+    "Generations": 1000,
+    "MaxSteps": 25,
+    "MutProb": 0.50,
+    "SurvivorRatio": 0.04,
+}
 
 """
 define the distance formula for determining the distance of a snake at a
@@ -44,22 +53,10 @@ class Snake():
         self.select_prob = 0
         self.selected = False
 
-        if USE_ANIMATION:
-            self.path_x = []
-            self.path_y = []
-            self.path_x.append(start[0])
-            self.path_y.append(start[1])
-
     def hunt(self):
         if self.path:
             self.loc = self.start
             self.path = []
-        if USE_ANIMATION:
-            if self.path_x or self.path_y:
-                self.path_x = []
-                self.path_y = []
-                self.path_x.append(self.start[0])
-                self.path_y.append(self.start[1])
 
         for i in range(self.max_steps):
             self.loc = [
@@ -67,12 +64,6 @@ class Snake():
                     self.loc[1] + sin(self.alphas[i][1])
             ]
             self.path.append(self.loc)
-            if USE_ANIMATION:
-                self.path_x.append(self.loc[0])
-                self.path_y.append(self.loc[1])
-        if USE_ANIMATION:
-            ax.plot(self.path_x, self.path_y, color = 'g')
-            fig.canvas.draw()
 
 
 def gen_snakes(start, opts):
@@ -123,13 +114,16 @@ def evaluate(snake, goal, playground, opts):
     return sorted(distances), goal_reached
 
 
-def calc_select_prob(snake, evals):
+def calc_select_prob(snake, evals, total=None):
     """ Calculates the probability of a snake being selected for survival
     params:
         snake: class, Snake
         evals: list, evaluations of all snakes
+        total: float, sum of evals if already known
     """
-    snake.select_prob = 1 - (snake.eval / sum(evals))
+    if total is None:
+        total = sum(evals)
+    snake.select_prob = 1 - (snake.eval / total)
 
 
 def select_survivors(snakes, num_survivors, survival_thresh):
@@ -145,11 +139,9 @@ def select_survivors(snakes, num_survivors, survival_thresh):
             the indices of the associated snakes
     """
     survivors = []
-    select_probs = dict()
-    for i in range(len(snakes)):
-        select_probs[str(i)] = snakes[i].select_prob
-    sorted_probs = sorted(select_probs.items(), key = operator.itemgetter(1),
-            reverse = True)
+    select_probs = [snake.select_prob for snake in snakes]
+    sorted_probs = sorted(enumerate(select_probs),
+            key = operator.itemgetter(1), reverse = True)
     count = 0
     for i in range(len(sorted_probs)):
         if (survival_thresh <= sorted_probs[i][1]):
@@ -172,15 +164,15 @@ def xover_selection(snakes, survivors, opts, num_survivors):
     """
     parents = []
     max_num_parents = opts["PopulationSize"] - num_survivors
-    while len(parents) < max_num_parents:
-        for survivor in survivors:
-            if (len(parents) < max_num_parents):
-                parents.append(survivor)
-        for snake in snakes:
-            if snake not in survivors:
-                if snake.selected:
-                    if (len(parents) < max_num_parents):
-                        parents.append(snake)
+    # the survivors then the other selected snakes, repeated until there
+    # are enough, there are no parents if nothing survived or was selected
+    survivor_ids = set(map(id, survivors))
+    pool = list(survivors)
+    for snake in snakes:
+        if snake.selected and id(snake) not in survivor_ids:
+            pool.append(snake)
+    while pool and len(parents) < max_num_parents:
+        parents.extend(pool[:max_num_parents - len(parents)])
     return parents
 
 
@@ -228,7 +220,8 @@ def mutation(next_gen, opts):
             ]
 
 
-def ga_soln_snakes():
+def ga_soln_snakes(verbose=True, stats=None, opts=None, start=None,
+        goal=None, playground=None, log=None, metrics=None):
     """ Creates population of snakes that hunt for food and make children.
 
     Uses a genetic algorithm where snakes are placed at a starting position
@@ -239,68 +232,102 @@ def ga_soln_snakes():
     generation is created by crossing the alphas of snake pairs to create
     children. There is a chance after crossover of each snake regenerating
     one of their alphas(mutating)
+    params:
+        verbose: bool, print the goal messages, and the closest snake of
+                    every generation through a ConsoleSink when metrics
+                    is None
+        stats: dict or None, gets "goal_reached" set when given
+        opts: dict, contains hyperparameters, a copy of OPTS when None
+        start: list, [x, y], START when None
+        goal: list, [x, y], GOAL when None
+        playground: list of 2 tuples, [x(min, max), y(min, max)],
+                    PLAYGROUND when None
+        log: weiglej_evolog.EvolutionLog, gets the paths of every
+                    generation when given
+        metrics: weiglej_metrics.Metrics, times the phases and gets a
+                    record of every generation when given
+    returns:
+        int, generations run
     """
     # set things up
-    playground = [(0,32), (0,18)]
-    start = [5, 1]
-    goal = [21, 13]
+    if playground is None:
+        playground = PLAYGROUND
+    if start is None:
+        start = START
+    if goal is None:
+        goal = GOAL
     goal_distance = dist(start, goal)
-    opts = dict()
-    opts.update({
-        "PopulationSize": 50,
-        "Generations": 1000,
-        "MaxSteps": 25,
-        "MutProb": 0.50,
-    })
-    num_survivors = int(opts["PopulationSize"] * 0.04)
+    if opts is None:
+        opts = dict(OPTS)
+    num_survivors = int(opts["PopulationSize"]
+            * opts.get("SurvivorRatio", OPTS["SurvivorRatio"]))
     snakes = gen_snakes(start, opts)
     total_generations = opts["Generations"]
+    if metrics is None and verbose:
+        metrics = weiglej_metrics.Metrics([weiglej_metrics.ConsoleSink()])
+    timer = metrics.timer if metrics is not None else None
+    evaluations = 0
     #end setup
 
-    print("----------------------")
-    print("| Beginning the hunt |")
-    print("----------------------")
-    print("Goal located at " + str(goal))
+    if verbose:
+        print("----------------------")
+        print("| Beginning the hunt |")
+        print("----------------------")
+        print("Goal located at " + str(goal))
+    goal_reached = False
     for generation in range(opts["Generations"]):
-        if USE_ANIMATION:
-            ax.cla()
-            ax.set_xlim(left = 0, right = 32)
-            ax.set_ylim(bottom = 0, top = 18)
-
+        if timer is not None:
+            timer.start()
         # Path generation
         for snake in snakes:
             snake.hunt()
+        if timer is not None:
+            timer.lap("hunt")
 
         # Evaluation of path
         best_distances = []
         for snake in snakes:
             distances, goal_reached = evaluate(snake, goal, playground, opts)
             best_distances.append(distances[0])
+            evaluations += len(distances)
             if goal_reached:
-                print("======================================================")
-                print("!!!!!  GOAL  !!!!!")
-                print("Generations elapsed: " + str(generation + 1))
-                print("Distance from goal achieved: " + str(distances[0]))
-                print("Starting distance from goal: " + str(goal_distance))
-                print("======================================================")
-                print("\n")
+                if verbose:
+                    print("=" * 54)
+                    print("!!!!!  GOAL  !!!!!")
+                    print("Generations elapsed: " + str(generation + 1))
+                    print("Distance from goal achieved: "
+                            + str(distances[0]))
+                    print("Starting distance from goal: "
+                            + str(goal_distance))
+                    print("=" * 54)
+                    print("\n")
                 total_generations = generation + 1
                 break
-        if goal_reached:
-            break
-        best_distances = sorted(best_distances)
-        print("Closest snake of generation "
-                + str(generation + 1)
-                + ": "
-                + str(best_distances[0]))
-
+        if timer is not None:
+            timer.lap("evaluate")
+
+        # Record the paths for replaying later
+        if log is not None:
+            log.append(generation + 1,
+                    [[start] + snake.path for snake in snakes],
+                    min(best_distances))
         evals = []
         for snake in snakes:
             evals.append(snake.eval)
+        if metrics is not None:
+            # only the snakes evaluated before the goal was reached
+            record = weiglej_metrics.generation_record(generation + 1,
+                    min(best_distances), evals[:len(best_distances)],
+                    [snake.alphas for snake in snakes], evaluations,
+                    goal_reached)
+            timer.start()
+        if goal_reached:
+            break
 
         # Selection probability calculation
+        total = sum(evals)
         for snake in snakes:
-            calc_select_prob(snake, evals)
+            calc_select_prob(snake, evals, total)
 
         # Generate survivor threshold and pick survivors
         survival_thresh = random.uniform(0, 1)
@@ -314,18 +341,29 @@ def ga_soln_snakes():
 
         # Determine the parents for crossover
         parents = xover_selection(survivors, snakes, opts, num_survivors)
+        if timer is not None:
+            timer.lap("select")
 
         # Crossover to make children
         children = xover(parents, opts, start)
         for child in children:
             next_gen.append(child)
+        if timer is not None:
+            timer.lap("crossover")
 
         # Chance for each snake to mutate
         mutation(next_gen, opts)
+        if timer is not None:
+            timer.lap("mutation")
+            metrics.emit(record)
 
         # The new generation becomes the current one
         snakes = next_gen
 
+    if goal_reached and metrics is not None:
+        metrics.emit(record)
+    if stats is not None:
+        stats["goal_reached"] = goal_reached
     return total_generations
 
 
@@ -335,17 +373,32 @@ if __name__=="__main__":
     while(animate != 'y' and animate != 'n'):
         print("Choices are y or n")
         animate = input("animate??? y/n\n")
-    if (animate == 'y'):
-        USE_ANIMATION = True
-    if USE_ANIMATION:
-        fig = plt.figure()
-        ax = fig.add_subplot(111)
-        ax.set_xlim(left = 0, right = 32)
-        ax.set_ylim(bottom = 0, top = 18)
-        fig.show()
 
     s = 0
-    for i in range(trials):
-        s += ga_soln_snakes()
+    if (animate == 'y'):
+        # each trial is recorded to a log at full speed and replayed after,
+        # the logs are deleted with their temporary directory
+        import os
+        import tempfile
+        import weiglej_evolog
+        with tempfile.TemporaryDirectory() as log_dir:
+            logs = []
+            for i in range(trials):
+                logs.append(os.path.join(log_dir,
+                        "ga_evolution_" + str(i + 1) + ".bin"))
+                with weiglej_evolog.EvolutionLog(logs[-1],
+                        OPTS["MaxSteps"], GOAL, PLAYGROUND) as log:
+                    s += ga_soln_snakes(log=log)
+            for fn in logs:
+                weiglej_evolog.render(fn)
+    else:
+        # without animation the trials run in parallel, each with its own
+        # seed from the printed base seed so the run can be repeated
+        import weiglej_trials
+        seed = random.randrange(2**32)
+        results = weiglej_trials.run_trials(trials, seed, engine="snakes")
+        s = sum(r["generations"] for r in results)
+        weiglej_trials.print_summary(weiglej_trials.summarize(results))
+        print("Base seed: " + str(seed))
     print("Average number of generations to reach goal: ")
     print(s/trials)
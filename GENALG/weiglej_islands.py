@@ -0,0 +1,210 @@
+#---------------------------------------#
+#       Island model GA                 #
+#---------------------------------------#
+# Runs several vectorized snake populations (islands) in their own
+# processes, every few generations each island sends copies of its best
+# snakes to another island along a ring or to a random one, the first
+# island to reach the goal stops all of them, e.g.
+#   python weiglej_islands.py --islands 4 --population 20000 --interval 5
+
+import argparse
+import multiprocessing
+import queue
+import time
+
+import numpy as np
+
+import weiglej_population
+
+TOPOLOGIES = ("ring", "random")
+
+
+def _migrants(population, count):
+    """ Genomes and evals of the best snakes of an evaluated population """
+    best = np.argsort(population.evals, kind='stable')[:count]
+    return population.alphas[best].copy(), population.evals[best].copy()
+
+
+def _settle(population, alphas, evals):
+    """ Immigrants replace the worst snakes, their evals come with them so
+    selection can use them before they hunt on this island
+    """
+    count = min(len(alphas), len(population))
+    if count == 0:
+        return
+    worst = np.argsort(population.evals, kind='stable')[-count:]
+    population.replace(worst, alphas[:count])
+    population.evals[worst] = evals[:count]
+
+
+def run_island(island, islands, seed, opts, problem, interval, migrants,
+        topology, inboxes, stop, winner, results):
+    """ Evolves one island until the goal is reached anywhere, or for
+    opts["Generations"] generations
+    params:
+        island: int, number of this island
+        islands: int, number of islands
+        seed: numpy.random.SeedSequence, seed of this island
+        opts: dict, contains hyperparameters, PopulationSize is per island
+        problem: tuple, (start, goal, playground)
+        interval: int, generations between migrations
+        migrants: int, snakes sent per migration
+        topology: str, "ring" sends to the next island, "random" to a
+                    random other island each time
+        inboxes: list, a multiprocessing.Queue per island
+        stop: multiprocessing.Event, set once any island reaches the goal
+        winner: multiprocessing.Value, number of the first island to
+                    reach the goal, -1 until then
+        results: multiprocessing.Queue, gets one result dict per island
+    """
+    start, goal, playground = problem
+    rng = np.random.default_rng(seed)
+    population = weiglej_population.gen_population(rng, opts)
+    generation = 0
+    reached = False
+    received = 0
+    while generation < opts["Generations"] and not stop.is_set():
+        generation += 1
+        population.hunt(start)
+        if population.evaluate(goal, playground):
+            reached = True
+            with winner.get_lock():
+                if winner.value == -1:
+                    winner.value = island
+            stop.set()
+            break
+
+        if islands > 1 and generation % interval == 0:
+            if topology == "ring":
+                target = (island + 1) % islands
+            else:
+                target = int(rng.integers(0, islands - 1))
+                if target >= island:
+                    target += 1
+            inboxes[target].put(_migrants(population, migrants))
+            # migration is asynchronous, take whatever has arrived
+            while True:
+                try:
+                    alphas, evals = inboxes[island].get_nowait()
+                except queue.Empty:
+                    break
+                _settle(population, alphas, evals)
+                received += len(alphas)
+
+        population = weiglej_population.next_generation(rng, population,
+                opts)
+
+    # snakes still queued for stopped islands are dropped on exit
+    for inbox in inboxes:
+        inbox.cancel_join_thread()
+    results.put({
+        "island": island,
+        "generations": generation,
+        "goal_reached": reached,
+        "best": float(population.best.min()) if reached else None,
+        "received": received,
+    })
+
+
+def ga_soln_islands(islands=None, opts=None, seed=None, interval=10,
+        migrants=2, topology="ring", start=weiglej_population.START,
+        goal=weiglej_population.GOAL,
+        playground=weiglej_population.PLAYGROUND):
+    """ Runs the island model GA, one process per island
+    params:
+        islands: int, number of islands, os.cpu_count() when None
+        opts: dict, contains hyperparameters, PopulationSize is per island
+        seed: int, base seed, every island gets an independent stream
+        interval: int, generations between migrations
+        migrants: int, snakes sent per migration
+        topology: str, "ring" or "random"
+        start: list, [x, y]
+        goal: list, [x, y]
+        playground: list of 2 tuples, [x(min, max), y(min, max)]
+    returns:
+        dict with winner (island number or None), generations of the
+        winner, and the result dict of every island
+    """
+    if topology not in TOPOLOGIES:
+        raise ValueError("unknown topology " + repr(topology))
+    if islands is None:
+        islands = multiprocessing.cpu_count()
+    if opts is None:
+        opts = weiglej_population.OPTS
+    seeds = np.random.SeedSequence(seed).spawn(islands)
+    inboxes = [multiprocessing.Queue() for i in range(islands)]
+    stop = multiprocessing.Event()
+    winner = multiprocessing.Value('i', -1)
+    results = multiprocessing.Queue()
+    problem = (start, goal, playground)
+
+    workers = []
+    for island in range(islands):
+        worker = multiprocessing.Process(target=run_island, args=(island,
+                islands, seeds[island], opts, problem, interval, migrants,
+                topology, inboxes, stop, winner, results))
+        worker.start()
+        workers.append(worker)
+    island_results = []
+    while len(island_results) < islands:
+        try:
+            island_results.append(results.get(timeout=1))
+        except queue.Empty:
+            # an island that crashed never sends its result
+            failed = [w.exitcode for w in workers if w.exitcode]
+            if failed:
+                stop.set()
+                for worker in workers:
+                    worker.join()
+                raise RuntimeError("an island exited with code "
+                        + str(failed[0]))
+    for worker in workers:
+        worker.join()
+
+    island_results.sort(key=lambda result: result["island"])
+    if winner.value == -1:
+        return {"winner": None, "generations": opts["Generations"],
+                "islands": island_results}
+    return {
+        "winner": winner.value,
+        "generations": island_results[winner.value]["generations"],
+        "islands": island_results,
+    }
+
+
+if __name__=="__main__":
+    parser = argparse.ArgumentParser(description="Island model snake GA")
+    parser.add_argument("--islands", type=int, default=None)
+    parser.add_argument("--population", type=int,
+            default=weiglej_population.OPTS["PopulationSize"],
+            help="snakes per island")
+    parser.add_argument("--generations", type=int,
+            default=weiglej_population.OPTS["Generations"])
+    parser.add_argument("--mutprob", type=float,
+            default=weiglej_population.OPTS["MutProb"])
+    parser.add_argument("--interval", type=int, default=10)
+    parser.add_argument("--migrants", type=int, default=2)
+    parser.add_argument("--topology", choices=TOPOLOGIES, default="ring")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    opts = dict(weiglej_population.OPTS)
+    opts.update({
+        "PopulationSize": args.population,
+        "Generations": args.generations,
+        "MutProb": args.mutprob,
+    })
+    t = time.perf_counter()
+    result = ga_soln_islands(args.islands, opts, args.seed, args.interval,
+            args.migrants, args.topology)
+    elapsed = time.perf_counter() - t
+    for island in result["islands"]:
+        print("Island %d: %d generations, %d snakes received%s" % (
+                island["island"], island["generations"], island["received"],
+                ", reached the goal" if island["goal_reached"] else ""))
+    if result["winner"] is None:
+        print("Goal not reached after %d generations" % result["generations"])
+    else:
+        print("Island %d reached the goal in generation %d" % (
+                result["winner"], result["generations"]))
+    print("%.3f s" % elapsed)
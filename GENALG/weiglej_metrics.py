@@ -0,0 +1,167 @@
+#---------------------------------------#
+#       GA metrics                      #
+#---------------------------------------#
+# Times the phases of every GA generation and sends one record of
+# metrics per generation to pluggable sinks, a sink is any callable
+# taking the record dict, e.g. a list's append, JsonlSink or ConsoleSink
+#   python weiglej_population.py --seed 1 --metrics run.jsonl --every 10
+# a record holds generation, best (closest distance), mean (mean eval),
+# diversity (mean standard deviation of each angle over the snakes),
+# evaluations (distances calculated so far), reached and the seconds of
+# each of PHASES spent on that generation
+# the GA only reads the clock when it is given a Metrics, so runs
+# without one pay nothing, and NumPy is not imported so the object GA
+# of weiglej_ga.py runs without it
+
+import json
+from statistics import fmean, pstdev
+from time import perf_counter
+
+PHASES = ("hunt", "evaluate", "select", "crossover", "mutation")
+
+
+class PhaseTimer():
+    """ Accumulates the seconds spent in each phase with perf_counter, a
+    lap charges the time since the last start or lap to a phase
+    methods:
+        start: restarts the clock without charging any phase
+        lap: charges the time since the last start or lap to a phase
+        end_generation: the seconds of the generation, added to the totals
+    """
+    def __init__(self):
+        self.seconds = dict.fromkeys(PHASES, 0.0)
+        self.totals = dict.fromkeys(PHASES, 0.0)
+        self.last = perf_counter()
+
+    def start(self):
+        self.last = perf_counter()
+
+    def lap(self, phase):
+        now = perf_counter()
+        self.seconds[phase] += now - self.last
+        self.last = now
+
+    def end_generation(self):
+        seconds = self.seconds
+        for phase, value in seconds.items():
+            self.totals[phase] += value
+        self.seconds = dict.fromkeys(PHASES, 0.0)
+        return seconds
+
+
+class Metrics():
+    """ Phase timer of a run plus the sinks its generation records go to
+    params:
+        sinks: list of callables, each gets every record
+    methods:
+        emit: sends the record of a generation to every sink
+        close: closes the sinks that have a close method
+    """
+    def __init__(self, sinks=()):
+        self.sinks = list(sinks)
+        self.timer = PhaseTimer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def emit(self, record):
+        """ Adds the phase seconds of the generation to record and sends it
+        params:
+            record: dict, from generation_record
+        """
+        record["seconds"] = self.timer.end_generation()
+        for sink in self.sinks:
+            sink(record)
+
+    def close(self):
+        for sink in self.sinks:
+            if hasattr(sink, "close"):
+                sink.close()
+
+
+def diversity(alphas):
+    """ Mean over every step and angle of its standard deviation over
+    the snakes, 0 once all snakes have the same genome
+    params:
+        alphas: float array or nested lists (snakes, MaxSteps, 2)
+    """
+    if hasattr(alphas, "std"):
+        return float(alphas.std(axis=0).mean())
+    # Snake.alphas lists, one column per step and angle
+    return fmean(pstdev(column) for step in zip(*alphas)
+            for column in zip(*step))
+
+
+def generation_record(generation, best, evals, alphas, evaluations,
+        reached):
+    """ Metrics of an evaluated generation
+    params:
+        generation: int, generation number
+        best: float, closest distance of any snake
+        evals: float array or list, eval score of every snake
+        alphas: float array or nested lists, genome of every snake
+        evaluations: int, distances calculated so far
+        reached: bool, whether a snake reached the goal
+    returns:
+        dict
+    """
+    return {
+        "generation": generation,
+        "best": float(best),
+        "mean": float(evals.mean() if hasattr(evals, "mean")
+                else fmean(evals)),
+        "diversity": diversity(alphas),
+        "evaluations": int(evaluations),
+        "reached": bool(reached),
+    }
+
+
+class JsonlSink():
+    """ Writes every record as a line of JSON
+    params:
+        fn: str, file to create
+    """
+    def __init__(self, fn):
+        self.f = open(fn, "w")
+
+    def __call__(self, record):
+        self.f.write(json.dumps(record) + "\n")
+
+    def close(self):
+        self.f.close()
+
+
+class ConsoleSink():
+    """ Prints the closest snake of every n-th generation like the GA
+    always did, the generation that reaches the goal is left to the GA's
+    own goal message
+    params:
+        every: int, print every n-th generation
+        phases: bool, add the milliseconds of each phase
+    """
+    def __init__(self, every=1, phases=False):
+        self.every = every
+        self.phases = phases
+
+    def __call__(self, record):
+        if record["reached"] or record["generation"] % self.every:
+            return
+        line = ("Closest snake of generation "
+                + str(record["generation"])
+                + ": "
+                + str(record["best"]))
+        if self.phases:
+            line += "  " + " ".join("%s=%.3fms" % (phase, 1000 * seconds)
+                    for phase, seconds in record["seconds"].items())
+        print(line)
+
+
+def print_totals(timer):
+    """ Seconds of each phase over the whole run and its share """
+    total = sum(timer.totals.values())
+    for phase, seconds in timer.totals.items():
+        share = seconds / total if total else 0.0
+        print("%-10s %9.3f s %6.1f%%" % (phase, seconds, 100 * share))
@@ -0,0 +1,488 @@
+#---------------------------------------#
+#       Vectorized snake population     #
+#---------------------------------------#
+# The snake GA of weiglej_ga.py with the whole population held in NumPy
+# arrays instead of Snake objects, every genome is a row of one
+# (population, MaxSteps, 2) array of angles and each phase works on all
+# snakes at once, e.g.
+#   python weiglej_population.py --population 100000 --seed 1
+
+import argparse
+import time
+from math import pi
+
+import numpy as np
+
+import weiglej_evolog
+import weiglej_ga
+import weiglej_metrics
+import weiglej_selection
+
+# the same problem and hyperparameters as ga_soln_snakes
+PLAYGROUND = weiglej_ga.PLAYGROUND
+START = weiglej_ga.START
+GOAL = weiglej_ga.GOAL
+OPTS = dict(weiglej_ga.OPTS, Selection="threshold")
+# snakes per block of the distance calculation and crossover, keeps their
+# temporaries in cache which makes them a few times faster for large
+# populations
+BLOCK = 1024
+
+
+def _split(x):
+    """ Veltkamp split of x into a 26 bit high part and the rest """
+    t = x * 134217729.0
+    hi = t - (t - x)
+    return hi, x - hi
+
+
+def hypot(dx, dy, out=None):
+    """ Elementwise math.hypot, NumPy's hypot can be an ulp off the
+    correctly rounded result Python gives, which shifts eval scores, so
+    this follows CPython's scaled double length sum step for step
+    params:
+        dx, dy: float arrays
+        out: float array for the result, a new one when None
+    returns:
+        float array of distances
+    """
+    ax = np.abs(dx)
+    ay = np.abs(dy)
+    largest = np.maximum(ax, ay)
+    scale = np.ldexp(1.0, -np.frexp(largest)[1])
+    csum = 1.0
+    frac1 = 0.0
+    frac2 = 0.0
+    for v in (ax, ay):
+        v = v * scale
+        hi, lo = _split(v)
+        # exact square as z + (p - z + q + lo*lo), then exact csum + z
+        p = hi * hi
+        q = 2.0 * (hi * lo)
+        z = p + q
+        frac1 = frac1 + (p - z + q + lo * lo)
+        s = csum + z
+        frac2 = frac2 + ((csum - s) + z)
+        csum = s
+    h = np.sqrt(csum - 1.0 + (frac1 + frac2))
+    # one correction step with the exact residual of h*h
+    hi, lo = _split(h)
+    p = -hi * hi
+    q = -2.0 * (hi * lo)
+    z = p + q
+    frac1 = frac1 + (p - z + q - lo * lo)
+    s = csum + z
+    frac2 = frac2 + ((csum - s) + z)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # 0/0 where both are zero, fixed up below
+        h = h + (s - 1.0 + (frac1 + frac2)) / (2.0 * h)
+    out = np.divide(h, scale, out=out)
+    np.copyto(out, 0.0, where=largest == 0)
+    return out
+
+
+def random_alphas(rng, shape):
+    """ Random angles like a new Snake draws them, [0, pi) for the x step
+    and [0, pi/2) for the y step
+    params:
+        rng: numpy.random.Generator
+        shape: tuple, leading shape, a trailing axis of 2 is added
+    returns:
+        float array of shape + (2,)
+    """
+    alphas = rng.random(tuple(shape) + (2,))
+    alphas *= (pi, pi/2)
+    return alphas
+
+
+class Population():
+    """ Population of snakes stored as arrays, every buffer is allocated
+    once and reused each generation, the genomes are double buffered so
+    the next generation is bred into the spare buffer and then swapped in
+    the cos/sin moves and goal distances of every snake are kept with its
+    genome, together with the first step whose angles changed since they
+    were calculated, so only mutated angles and the distances from the
+    first changed step onward are calculated again
+    params:
+        alphas: float array (population, MaxSteps, 2), the genome of each
+                    snake, the angles Snake.alphas holds as lists
+    methods:
+        hunt: paths of every snake from a start location
+        evaluate: eval score, closest distance and goal flag of every snake
+        replace: new genomes for some of the snakes
+        swap: makes the spare buffers the current ones
+    """
+    def __init__(self, alphas):
+        n, steps = alphas.shape[:2]
+        self.alphas = alphas
+        self.moves = np.empty_like(alphas)
+        np.cos(alphas[:, :, 0], out=self.moves[:, :, 0])
+        np.sin(alphas[:, :, 1], out=self.moves[:, :, 1])
+        self.distances = np.empty((n, steps))
+        # first step of each snake whose distance is out of date
+        self.dirty = np.zeros(n, dtype=np.intp)
+        self.spare = np.empty_like(alphas)
+        self.spare_moves = np.empty_like(alphas)
+        self.spare_distances = np.empty_like(self.distances)
+        self.spare_dirty = np.empty_like(self.dirty)
+        self.start = None
+        self.goal = None
+        # distances calculated so far
+        self.evaluations = 0
+
+        # the start column followed by every location of the paths
+        self.walk = np.empty((n, steps + 1, 2))
+        self.paths = self.walk[:, 1:]
+        self.evals = np.empty(n)
+        self.best = np.empty(n)
+        self.reached = np.zeros(n, dtype=bool)
+        self.oob = np.empty((n, steps), dtype=bool)
+        self.near = np.empty((n, steps), dtype=bool)
+        self.any_oob = np.empty(n, dtype=bool)
+        self.any_near = np.empty(n, dtype=bool)
+        # crossover scratch for a block of genomes
+        self.scratch = np.empty((BLOCK, steps, 2))
+
+    def __len__(self):
+        return len(self.alphas)
+
+    def swap(self):
+        self.alphas, self.spare = self.spare, self.alphas
+        self.moves, self.spare_moves = self.spare_moves, self.moves
+        self.distances, self.spare_distances = (self.spare_distances,
+                self.distances)
+        self.dirty, self.spare_dirty = self.spare_dirty, self.dirty
+
+    def replace(self, rows, alphas):
+        """ Overwrites the genomes of some snakes, their moves are
+        recalculated and their distances marked out of date
+        params:
+            rows: index array of the snakes
+            alphas: float array (len(rows), MaxSteps, 2), new genomes
+        """
+        self.alphas[rows] = alphas
+        self.moves[rows, :, 0] = np.cos(alphas[:, :, 0])
+        self.moves[rows, :, 1] = np.sin(alphas[:, :, 1])
+        self.dirty[rows] = 0
+
+    def hunt(self, start):
+        """ Cumulative sum of the cos/sin moves of every snake, the start is
+        summed in first so every location is rounded exactly like the
+        step by step loc + step of Snake.hunt
+        """
+        if self.start != tuple(start):
+            self.start = tuple(start)
+            self.dirty[:] = 0
+        walk = self.walk
+        walk[:, 0] = start
+        walk[:, 1:] = self.moves
+        np.cumsum(walk, axis=1, out=walk)
+        return self.paths
+
+    def evaluate(self, goal, playground):
+        """ Same scores as evaluate() in weiglej_ga.py, for all snakes:
+        first step out of the playground + 38, else first step within 0.5
+        of the goal, else 25 + the distance left after the last step
+        params:
+            goal: list, [x, y]
+            playground: list of 2 tuples, [x(min, max), y(min, max)]
+        returns:
+            bool, whether any snake reached the goal
+        """
+        if self.goal != tuple(goal):
+            self.goal = tuple(goal)
+            self.dirty[:] = 0
+        x = self.paths[:, :, 0]
+        y = self.paths[:, :, 1]
+        step = np.arange(x.shape[1])
+        for lo in range(0, len(x), BLOCK):
+            hi = lo + BLOCK
+            dirty = self.dirty[lo:hi]
+            if not dirty.any():
+                hypot(goal[0] - x[lo:hi], goal[1] - y[lo:hi],
+                        out=self.distances[lo:hi])
+                self.evaluations += x[lo:hi].size
+                continue
+            stale = step >= dirty[:, None]
+            count = int(np.count_nonzero(stale))
+            if count:
+                self.distances[lo:hi][stale] = hypot(
+                        goal[0] - x[lo:hi][stale], goal[1] - y[lo:hi][stale])
+                self.evaluations += count
+        self.dirty[:] = len(step)
+
+        # the lower y bound is checked against x like evaluate() does
+        oob = self.oob
+        np.less(playground[0][1], x, out=oob)
+        oob |= x < playground[0][0]
+        oob |= playground[1][1] < y
+        oob |= x < playground[1][0]
+        np.less(self.distances, 0.5, out=self.near)
+        np.any(oob, axis=1, out=self.any_oob)
+        np.any(self.near, axis=1, out=self.any_near)
+
+        np.add(self.distances[:, -1], 25, out=self.evals)
+        np.copyto(self.evals, self.near.argmax(axis=1), where=self.any_near)
+        np.copyto(self.evals, oob.argmax(axis=1) + 38, where=self.any_oob)
+        np.logical_not(self.any_oob, out=self.reached)
+        self.reached &= self.any_near
+        # evaluate() sorts worst first for snakes that went out of bounds
+        np.min(self.distances, axis=1, out=self.best)
+        np.copyto(self.best, self.distances.max(axis=1), where=self.any_oob)
+        return bool(self.reached.any())
+
+
+def gen_population(rng, opts):
+    """ Generates the initial population
+    params:
+        rng: numpy.random.Generator
+        opts: dict, contains hyperparameters
+    returns:
+        Population
+    """
+    return Population(random_alphas(rng,
+            (opts["PopulationSize"], opts["MaxSteps"])))
+
+
+def swap_tails(out, cut, scratch=None):
+    """ Swaps the rows of each consecutive pair of out after their cut
+    params:
+        out: array, rows 2i and 2i+1 are a pair
+        cut: int array, first step to swap of each pair
+        scratch: array, BLOCK rows of scratch space, allocated when None
+    """
+    pairs = len(out) // 2
+    if scratch is None:
+        scratch = np.empty((BLOCK,) + out.shape[1:])
+    after_cut = np.arange(out.shape[1]) >= cut[:pairs, None]
+    after_cut = after_cut.reshape(after_cut.shape + (1,) * (out.ndim - 2))
+    # in blocks as copying between the interleaved halves makes NumPy
+    # buffer the whole source
+    for lo in range(0, pairs, BLOCK):
+        hi = min(lo + BLOCK, pairs)
+        first = out[2*lo:2*hi:2]
+        second = out[2*lo+1:2*hi:2]
+        tail = after_cut[lo:hi]
+        temp = scratch[:hi - lo]
+        np.copyto(temp, first, where=tail)
+        np.copyto(first, second, where=tail)
+        np.copyto(second, temp, where=tail)
+
+
+def xover(rng, alphas, parents, out, scratch=None):
+    """ One point crossover of consecutive parent pairs, each pair gives
+    two children that swap their angles after a random cut in
+    [2, MaxSteps-2), written in place, an odd last parent is copied
+    params:
+        rng: numpy.random.Generator
+        alphas: float array, genomes of the current generation
+        parents: index array, from a weiglej_selection operator
+        out: float array, gets the children's genomes, one per parent
+        scratch: float array, (BLOCK, MaxSteps, 2) scratch space,
+                    allocated when None
+    returns:
+        int array, cut of each pair
+    """
+    steps = alphas.shape[1]
+    cut = rng.uniform(2, steps - 2, (len(parents) + 1) // 2).astype(np.intp)
+    np.take(alphas, parents, axis=0, out=out, mode='clip')
+    swap_tails(out, cut, scratch)
+    return cut
+
+
+def mutation(rng, alphas, mut_prob):
+    """ Random chance for each snake to regenerate one of its angles
+    params:
+        rng: numpy.random.Generator
+        alphas: float array, genomes to mutate in place
+        mut_prob: float, chance of a snake mutating
+    returns:
+        index array of the mutated snakes,
+        index array of the step mutated in each of them
+    """
+    n, steps = alphas.shape[:2]
+    mutants = np.flatnonzero(rng.random(n) < mut_prob)
+    picks = rng.integers(0, steps, len(mutants))
+    alphas[mutants, picks] = random_alphas(rng, (len(mutants),))
+    return mutants, picks
+
+
+def next_generation(rng, population, opts, timer=None):
+    """ Breeds the survivors plus the mutated children of an evaluated
+    population into its spare genome buffer and swaps that in
+    params:
+        rng: numpy.random.Generator
+        population: Population, after hunt and evaluate
+        opts: dict, contains hyperparameters
+        timer: weiglej_metrics.PhaseTimer, gets the select, crossover and
+                    mutation laps when given
+    returns:
+        the same Population holding the next generation, not yet hunted
+    """
+    n = len(population)
+    num_survivors = min(n, max(1, int(n * opts.get("SurvivorRatio",
+            OPTS["SurvivorRatio"]))))
+    survivors = weiglej_selection.elite(population.evals, num_survivors)
+    select = weiglej_selection.OPERATORS[opts.get("Selection", "threshold")]
+    parents = select(rng, population.evals, n - num_survivors, survivors)
+    if timer is not None:
+        timer.lap("select")
+    next_gen = population.spare
+    moves = population.spare_moves
+    distances = population.spare_distances
+    dirty = population.spare_dirty
+    # survivors keep their moves and distances, and how much of those is
+    # out of date, e.g. for snakes put in with replace()
+    for current, spare in ((population.alphas, next_gen),
+            (population.moves, moves), (population.distances, distances),
+            (population.dirty, dirty)):
+        np.take(current, survivors, axis=0, mode='clip',
+                out=spare[:num_survivors])
+
+    # children keep their parent's distances up to the cut, the moves are
+    # cos/sin of the angles so they cross over along with them
+    cut = xover(rng, population.alphas, parents, next_gen[num_survivors:],
+            population.scratch)
+    np.take(population.moves, parents, axis=0, mode='clip',
+            out=moves[num_survivors:])
+    swap_tails(moves[num_survivors:], cut, population.scratch)
+    np.take(population.distances, parents, axis=0, mode='clip',
+            out=distances[num_survivors:])
+    children = dirty[num_survivors:]
+    np.take(population.dirty, parents, mode='clip', out=children)
+    pairs = len(parents) // 2
+    np.minimum(children[:2*pairs], np.repeat(cut[:pairs], 2),
+            out=children[:2*pairs])
+    if timer is not None:
+        timer.lap("crossover")
+
+    mutants, picks = mutation(rng, next_gen, opts["MutProb"])
+    moves[mutants, picks, 0] = np.cos(next_gen[mutants, picks, 0])
+    moves[mutants, picks, 1] = np.sin(next_gen[mutants, picks, 1])
+    dirty[mutants] = np.minimum(dirty[mutants], picks)
+    population.swap()
+    if timer is not None:
+        timer.lap("mutation")
+    return population
+
+
+def ga_soln_population(opts=None, start=START, goal=GOAL,
+        playground=PLAYGROUND, rng=None, verbose=True, log=None,
+        metrics=None):
+    """ Runs the snake GA of ga_soln_snakes() on a vectorized population
+    params:
+        opts: dict, contains hyperparameters, OPTS when None
+        start: list, [x, y]
+        goal: list, [x, y]
+        playground: list of 2 tuples, [x(min, max), y(min, max)]
+        rng: numpy.random.Generator, a fresh unseeded one when None
+        verbose: bool, print the goal message, and the closest snake of
+                    every generation through a ConsoleSink when metrics
+                    is None
+        log: weiglej_evolog.EvolutionLog, gets the paths of every
+                    generation when given
+        metrics: weiglej_metrics.Metrics, times the phases and gets a
+                    record of every generation when given
+    returns:
+        int, generations run,
+        bool, whether the goal was reached
+    """
+    if opts is None:
+        opts = OPTS
+    if rng is None:
+        rng = np.random.default_rng()
+    if metrics is None and verbose:
+        metrics = weiglej_metrics.Metrics([weiglej_metrics.ConsoleSink()])
+    timer = metrics.timer if metrics is not None else None
+    population = gen_population(rng, opts)
+
+    for generation in range(opts["Generations"]):
+        if timer is not None:
+            timer.start()
+        population.hunt(start)
+        if timer is not None:
+            timer.lap("hunt")
+        reached = population.evaluate(goal, playground)
+        if timer is not None:
+            timer.lap("evaluate")
+        if log is not None:
+            log.append(generation + 1, population.walk,
+                    population.best.min())
+        if metrics is not None:
+            record = weiglej_metrics.generation_record(generation + 1,
+                    population.best.min(), population.evals,
+                    population.alphas, population.evaluations, reached)
+        if reached:
+            if metrics is not None:
+                metrics.emit(record)
+            if verbose:
+                first = int(population.reached.argmax())
+                print("Goal reached in generation " + str(generation + 1)
+                        + ", distance " + str(population.best[first]))
+            return generation + 1, True
+
+        # the metrics themselves are not charged to a phase
+        if timer is not None:
+            timer.start()
+        population = next_generation(rng, population, opts, timer)
+        if metrics is not None:
+            metrics.emit(record)
+
+    return opts["Generations"], False
+
+
+if __name__=="__main__":
+    parser = argparse.ArgumentParser(description="Vectorized snake GA")
+    parser.add_argument("--population", type=int,
+            default=OPTS["PopulationSize"])
+    parser.add_argument("--generations", type=int,
+            default=OPTS["Generations"])
+    parser.add_argument("--steps", type=int, default=OPTS["MaxSteps"])
+    parser.add_argument("--mutprob", type=float, default=OPTS["MutProb"])
+    parser.add_argument("--selection", choices=weiglej_selection.OPERATORS,
+            default=OPTS["Selection"])
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--quiet", action="store_true")
+    parser.add_argument("--log", default=None,
+            help="record every generation to this file for weiglej_evolog")
+    parser.add_argument("--log-snakes", type=int, default=None,
+            help="snakes per generation kept in the log, all when left out")
+    parser.add_argument("--metrics", default=None,
+            help="write the metrics of every generation to this JSONL file")
+    parser.add_argument("--every", type=int, default=1,
+            help="print the closest snake of every n-th generation")
+    parser.add_argument("--profile", action="store_true",
+            help="print the time spent in each phase")
+    args = parser.parse_args()
+
+    opts = dict(OPTS)
+    opts.update({
+        "PopulationSize": args.population,
+        "Generations": args.generations,
+        "MaxSteps": args.steps,
+        "MutProb": args.mutprob,
+        "Selection": args.selection,
+    })
+    log = None
+    if args.log:
+        log = weiglej_evolog.EvolutionLog(args.log, args.steps, GOAL,
+                PLAYGROUND, args.log_snakes)
+    sinks = []
+    if not args.quiet:
+        sinks.append(weiglej_metrics.ConsoleSink(args.every, args.profile))
+    if args.metrics:
+        sinks.append(weiglej_metrics.JsonlSink(args.metrics))
+    metrics = weiglej_metrics.Metrics(sinks)
+    t = time.perf_counter()
+    generations, goal_reached = ga_soln_population(opts,
+            rng=np.random.default_rng(args.seed), verbose=not args.quiet,
+            log=log, metrics=metrics if sinks or args.profile else None)
+    elapsed = time.perf_counter() - t
+    metrics.close()
+    if log is not None:
+        log.close()
+    if args.profile:
+        weiglej_metrics.print_totals(metrics.timer)
+    print(("Goal reached" if goal_reached else "Goal not reached")
+            + " after " + str(generations) + " generations in "
+            + "%.3f s" % elapsed)
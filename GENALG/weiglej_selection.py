@@ -0,0 +1,113 @@
+#---------------------------------------#
+#       Selection operators             #
+#---------------------------------------#
+# Parent selection for the vectorized GA, every operator works on the
+# array of eval scores of a population (lower is fitter) and returns an
+# index array of parents, they all scale as O(n log n) or better:
+#   threshold   the survivors then every snake whose selection probability
+#               meets a random threshold, the original GA's scheme
+#   tournament  fittest of a few snakes drawn at random, O(count * size)
+#   rank        linear ranking by eval, O(n log n + count log n)
+#   roulette    fitness proportional with a cumulative sum and binary
+#               search, O(n + count log n)
+
+import numpy as np
+
+
+def select_probs(evals):
+    """ Selection probability of every snake like calc_select_prob() in
+    weiglej_ga.py, 1 - eval / sum of evals
+    """
+    return 1 - evals / evals.sum()
+
+
+def elite(evals, count):
+    """ Snakes with the highest selection probability, ties keep the
+    population order like select_survivors() in weiglej_ga.py
+    params:
+        evals: float array, eval score of every snake
+        count: int, how many to pick
+    returns:
+        index array, best first
+    """
+    return np.argsort(-select_probs(evals), kind='stable')[:count]
+
+
+def threshold(rng, evals, count, survivors):
+    """ Parents like xover_selection() in weiglej_ga.py, the survivors
+    then the other snakes whose selection probability meets a random
+    threshold, in order and repeated until there are enough
+    params:
+        rng: numpy.random.Generator
+        evals: float array, eval score of every snake
+        count: int, how many parents to pick
+        survivors: index array, from elite
+    returns:
+        index array of parents
+    """
+    selected = rng.uniform(0, 1) <= select_probs(evals)
+    selected[survivors] = False
+    pool = np.concatenate((survivors, np.flatnonzero(selected)))
+    return np.resize(pool, count)
+
+
+def tournament(rng, evals, count, survivors=None, size=2):
+    """ Each parent is the fittest of size snakes drawn at random, ties go
+    to the first one drawn
+    params:
+        rng: numpy.random.Generator
+        evals: float array, eval score of every snake
+        count: int, how many parents to pick
+        survivors: unused
+        size: int, snakes per tournament
+    returns:
+        index array of parents
+    """
+    entrants = rng.integers(0, len(evals), (count, size))
+    winners = evals[entrants].argmin(axis=1)
+    return entrants[np.arange(count), winners]
+
+
+def rank(rng, evals, count, survivors=None, pressure=1.5):
+    """ Linear ranking, the fittest snake is picked pressure times as often
+    as the average one and the least fit 2 - pressure times as often
+    params:
+        rng: numpy.random.Generator
+        evals: float array, eval score of every snake
+        count: int, how many parents to pick
+        survivors: unused
+        pressure: float, selective pressure from 1 to 2
+    returns:
+        index array of parents
+    """
+    n = len(evals)
+    order = np.argsort(evals, kind='stable')
+    weights = np.linspace(pressure, 2 - pressure, n)
+    cumulative = np.cumsum(weights)
+    picks = np.searchsorted(cumulative, rng.random(count) * cumulative[-1],
+            side='right')
+    return order[np.minimum(picks, n - 1)]
+
+
+def roulette(rng, evals, count, survivors=None):
+    """ Fitness proportional selection on the selection probabilities
+    params:
+        rng: numpy.random.Generator
+        evals: float array, eval score of every snake
+        count: int, how many parents to pick
+        survivors: unused
+    returns:
+        index array of parents
+    """
+    cumulative = np.cumsum(select_probs(evals))
+    picks = np.searchsorted(cumulative, rng.random(count) * cumulative[-1],
+            side='right')
+    return np.minimum(picks, len(evals) - 1)
+
+
+OPERATORS = {
+    "threshold": threshold,
+    "tournament": tournament,
+    "rank": rank,
+    "roulette": roulette,
+}
@@ -0,0 +1,228 @@
+#---------------------------------------#
+#       GA hyperparameter sweep         #
+#---------------------------------------#
+# Runs GA configurations from a grid or random search space in parallel
+# and drops the clearly worse ones early with successive halving, every
+# configuration runs the same seeded trials so they are compared on the
+# same random draws, e.g. the mutation probability sweep of
+# ga_mutation_variation_results.xlsx:
+#   python weiglej_sweep.py --grid MutProb=0:1.0001:0.025 --out sweep.csv
+# values are Python literals or start:stop:step ranges for --grid and
+# low:high bounds for --random, e.g.
+#   --grid "goal=[[21, 13], [25, 15]]" --random PopulationSize=20:200
+
+import argparse
+import ast
+import csv
+import itertools
+import math
+import multiprocessing
+import time
+
+import numpy as np
+
+import weiglej_population
+import weiglej_trials
+
+OPTS_KEYS = ("PopulationSize", "Generations", "MaxSteps", "MutProb",
+        "SurvivorRatio", "Selection")
+PROBLEM_KEYS = ("start", "goal", "playground")
+
+
+def parse_values(text):
+    """ Values of a --grid option, a start:stop:step range or a literal,
+    a single literal that is not a list is one value
+    """
+    if ':' in text and '[' not in text:
+        start, stop, step = (ast.literal_eval(part) for part in text.split(':'))
+        return [round(v, 10) for v in np.arange(start, stop, step).tolist()]
+    values = ast.literal_eval(text)
+    if not isinstance(values, list):
+        values = [values]
+    return values
+
+
+def parse_bounds(text):
+    """ (low, high) of a --random option, ints stay ints """
+    low, high = (ast.literal_eval(part) for part in text.split(':'))
+    return low, high
+
+
+def check_keys(keys):
+    for key in keys:
+        if key not in OPTS_KEYS and key not in PROBLEM_KEYS:
+            raise ValueError("unknown parameter " + repr(key) + ", choose from "
+                    + ", ".join(OPTS_KEYS + PROBLEM_KEYS))
+
+
+def grid_space(grid):
+    """ Every combination of the grid values
+    params:
+        grid: dict, parameter name to list of values
+    returns:
+        list of configuration dicts
+    """
+    check_keys(grid)
+    names = list(grid)
+    return [dict(zip(names, values))
+            for values in itertools.product(*(grid[n] for n in names))]
+
+
+def random_space(bounds, samples, rng, fixed=None):
+    """ Configurations drawn uniformly from bounds, integer bounds give
+    integers from low to high inclusive
+    params:
+        bounds: dict, parameter name to (low, high)
+        samples: int, configurations to draw
+        rng: numpy.random.Generator
+        fixed: dict, values every configuration gets
+    returns:
+        list of configuration dicts
+    """
+    check_keys(bounds)
+    configs = []
+    for i in range(samples):
+        config = dict(fixed or {})
+        for name, (low, high) in bounds.items():
+            if isinstance(low, int) and isinstance(high, int):
+                config[name] = int(rng.integers(low, high + 1))
+            else:
+                config[name] = float(rng.uniform(low, high))
+        configs.append(config)
+    return configs
+
+
+def split_config(config):
+    """ GA opts and problem keyword arguments of a configuration """
+    opts = dict(weiglej_population.OPTS)
+    problem = {}
+    for key, value in config.items():
+        if key in PROBLEM_KEYS:
+            problem[key] = value
+        else:
+            opts[key] = value
+    return opts, problem
+
+
+def _sweep_trial(job):
+    index, trial, seed, engine, opts, problem = job
+    return index, weiglej_trials.run_trial(trial, seed, engine, opts,
+            problem)
+
+
+def successive_halving(configs, engine="population", seed=0, min_trials=8,
+        eta=2, max_trials=128, processes=None):
+    """ Runs every configuration for min_trials trials, keeps the best
+    1/eta of them by mean generations, gives those eta times as many
+    trials and so on, until one is left or they reach max_trials
+    params:
+        configs: list of configuration dicts
+        engine: str, see weiglej_trials.run_trial
+        seed: int, base seed, trial i of every configuration gets the same
+                    seed
+        min_trials: int, trials of the first round
+        eta: int, keep 1/eta of the configurations each round
+        max_trials: int, most trials of a configuration
+        processes: int, pool size, os.cpu_count() when None
+    returns:
+        list of records, each configuration with its rounds, seconds and
+        weiglej_trials.summarize statistics
+    """
+    split = [split_config(config) for config in configs]
+    results = [[] for config in configs]
+    rounds = [0] * len(configs)
+    alive = list(range(len(configs)))
+    budget = min(min_trials, max_trials)
+    seeds = []
+    with multiprocessing.Pool(processes) as pool:
+        while alive:
+            while len(seeds) < budget:
+                seeds.append(weiglej_trials.trial_seed(seed, len(seeds)))
+            jobs = [(i, t, seeds[t], engine) + split[i]
+                    for i in alive for t in range(len(results[i]), budget)]
+            for i, result in pool.imap_unordered(_sweep_trial, jobs):
+                results[i].append(result)
+            for i in alive:
+                rounds[i] += 1
+            if len(alive) <= 1 or budget >= max_trials:
+                break
+
+            # configurations are ranked on the same trials
+            means = {i: np.mean([r["generations"] for r in results[i]])
+                    for i in alive}
+            alive.sort(key=lambda i: means[i])
+            alive = alive[:math.ceil(len(alive) / eta)]
+            budget = min(budget * eta, max_trials)
+
+    records = []
+    for i, config in enumerate(configs):
+        record = dict(config)
+        record["rounds"] = rounds[i]
+        record["seconds"] = sum(r["seconds"] for r in results[i])
+        record.update(weiglej_trials.summarize(results[i]))
+        records.append(record)
+    records.sort(key=lambda r: (-r["rounds"], r["mean"]))
+    return records
+
+
+def write_table(records, fn):
+    """ Writes the records as a columnar csv, one column per parameter or
+    statistic and one row per configuration, list values as literals
+    """
+    columns = []
+    for record in records:
+        for key in record:
+            if key not in columns:
+                columns.append(key)
+    with open(fn, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        for record in records:
+            writer.writerow([record.get(key, "") for key in columns])
+
+
+if __name__=="__main__":
+    parser = argparse.ArgumentParser(description="GA hyperparameter sweep")
+    parser.add_argument("--grid", action="append", default=[],
+            metavar="NAME=VALUES", help="grid values of a parameter")
+    parser.add_argument("--random", action="append", default=[],
+            metavar="NAME=LOW:HIGH", help="random search bounds")
+    parser.add_argument("--samples", type=int, default=32,
+            help="configurations drawn for --random, per grid point")
+    parser.add_argument("--engine", choices=weiglej_trials.ENGINES,
+            default="population")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--min-trials", type=int, default=8)
+    parser.add_argument("--max-trials", type=int, default=128)
+    parser.add_argument("--eta", type=int, default=2)
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--out", default="sweep.csv")
+    args = parser.parse_args()
+
+    grid = {}
+    for option in args.grid:
+        name, text = option.split('=', 1)
+        grid[name] = parse_values(text)
+    bounds = {}
+    for option in args.random:
+        name, text = option.split('=', 1)
+        bounds[name] = parse_bounds(text)
+    configs = grid_space(grid)
+    if bounds:
+        rng = np.random.default_rng(args.seed)
+        configs = [c for fixed in configs
+                for c in random_space(bounds, args.samples, rng, fixed)]
+
+    t = time.perf_counter()
+    records = successive_halving(configs, args.engine, args.seed,
+            args.min_trials, args.eta, args.max_trials, args.processes)
+    elapsed = time.perf_counter() - t
+    write_table(records, args.out)
+    names = list(grid) + [n for n in bounds if n not in grid]
+    for record in records[:10]:
+        print("  ".join("%s=%s" % (n, record[n]) for n in names)
+                + "  trials=%d mean=%.2f failure_rate=%.3f" % (
+                record["trials"], record["mean"], record["failure_rate"]))
+    print("%d configurations, %d trials in %.2f s, written to %s" % (
+            len(records), sum(r["trials"] for r in records), elapsed,
+            args.out))
@@ -0,0 +1,200 @@
+#---------------------------------------#
+#       Parallel GA trial runner        #
+#---------------------------------------#
+# Runs many independent GA trials over a process pool, each trial gets
+# its own seed derived from one base seed so any run or single trial can
+# be reproduced, e.g.
+#   python weiglej_trials.py --trials 2000 --seed 7 --csv trials.csv
+
+import argparse
+import csv
+import multiprocessing
+import random
+import time
+
+import numpy as np
+
+import weiglej_ga
+import weiglej_population
+import weiglej_selection
+
+ENGINES = ("population", "snakes")
+PERCENTILES = (10, 25, 75, 90, 95, 99)
+
+
+def trial_seed(seed, trial):
+    """ Seed of one trial, independent of the other trials and of which
+    process runs it
+    params:
+        seed: int, base seed of the run
+        trial: int, trial number
+    returns:
+        int, 64 bit seed
+    """
+    state = np.random.SeedSequence((seed, trial)).generate_state(1, np.uint64)
+    return int(state[0])
+
+
+def run_trial(trial, seed, engine="population", opts=None, problem=None):
+    """ Runs one GA trial
+    params:
+        trial: int, trial number
+        seed: int, seed of the trial, from trial_seed
+        engine: str, "population" for the vectorized GA of
+                    weiglej_population, "snakes" for ga_soln_snakes
+        opts: dict, contains hyperparameters, the engine's own when None
+        problem: dict, start, goal and playground keyword arguments of
+                    the engine, its own for any that are left out
+    returns:
+        dict with trial, seed, generations, goal_reached and seconds
+    """
+    if problem is None:
+        problem = {}
+    t = time.perf_counter()
+    if engine == "population":
+        generations, goal_reached = weiglej_population.ga_soln_population(
+                opts, rng=np.random.default_rng(seed), verbose=False,
+                **problem)
+    elif engine == "snakes":
+        # ga_soln_snakes draws from the module level generator
+        random.seed(seed)
+        stats = {}
+        generations = weiglej_ga.ga_soln_snakes(verbose=False, stats=stats,
+                opts=opts, **problem)
+        goal_reached = stats["goal_reached"]
+    else:
+        raise ValueError("unknown engine " + repr(engine))
+    return {
+        "trial": trial,
+        "seed": seed,
+        "generations": generations,
+        "goal_reached": goal_reached,
+        "seconds": time.perf_counter() - t,
+    }
+
+
+def _run_trial(job):
+    return run_trial(*job)
+
+
+def run_trials(trials, seed=0, engine="population", opts=None,
+        processes=None, chunksize=None, problem=None):
+    """ Runs trials over a process pool
+    params:
+        trials: int, number of trials
+        seed: int, base seed of the run
+        engine: str, see run_trial
+        opts: dict, see run_trial
+        processes: int, pool size, os.cpu_count() when None, 1 runs the
+                    trials in this process
+        chunksize: int, trials handed to a worker at a time, picked from
+                    the number of trials and processes when None
+        problem: dict, see run_trial
+    returns:
+        list of result dicts of run_trial, ordered by trial
+    """
+    jobs = [(i, trial_seed(seed, i), engine, opts, problem)
+            for i in range(trials)]
+    if processes == 1:
+        return [_run_trial(job) for job in jobs]
+
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    if chunksize is None:
+        chunksize = max(1, trials // (processes * 8))
+    with multiprocessing.Pool(processes) as pool:
+        results = list(pool.imap_unordered(_run_trial, jobs, chunksize))
+    results.sort(key=lambda result: result["trial"])
+    return results
+
+
+def summarize(results):
+    """ Distribution of generations to reach the goal over all trials,
+    trials that never reached it count with the generations they ran
+    params:
+        results: list, result dicts of run_trial
+    returns:
+        dict of trials, failures, failure_rate, mean, median, min, max and
+        p<n> for each of PERCENTILES
+    """
+    generations = np.array([r["generations"] for r in results], dtype=float)
+    failures = sum(1 for r in results if not r["goal_reached"])
+    summary = {
+        "trials": len(results),
+        "failures": failures,
+        "failure_rate": failures / len(results) if results else 0.0,
+    }
+    if not results:
+        return summary
+    summary["mean"] = float(generations.mean())
+    summary["median"] = float(np.median(generations))
+    summary["min"] = float(generations.min())
+    summary["max"] = float(generations.max())
+    for p, value in zip(PERCENTILES, np.percentile(generations, PERCENTILES)):
+        summary["p" + str(p)] = float(value)
+    return summary
+
+
+def write_trials_csv(results, fn):
+    """ One row per trial """
+    with open(fn, "w", newline="") as f:
+        writer = csv.DictWriter(f, ["trial", "seed", "generations",
+                "goal_reached", "seconds"])
+        writer.writeheader()
+        writer.writerows(results)
+
+
+def write_summary_csv(summary, fn):
+    """ One row with the columns of summarize """
+    with open(fn, "w", newline="") as f:
+        writer = csv.DictWriter(f, list(summary))
+        writer.writeheader()
+        writer.writerow(summary)
+
+
+def print_summary(summary):
+    for key, value in summary.items():
+        if isinstance(value, float):
+            value = "%.3f" % value
+        print("%-14s %s" % (key, value))
+
+
+if __name__=="__main__":
+    parser = argparse.ArgumentParser(description="Parallel GA trial runner")
+    parser.add_argument("--trials", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--engine", choices=ENGINES, default="population")
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--population", type=int,
+            default=weiglej_population.OPTS["PopulationSize"])
+    parser.add_argument("--generations", type=int,
+            default=weiglej_population.OPTS["Generations"])
+    parser.add_argument("--mutprob", type=float,
+            default=weiglej_population.OPTS["MutProb"])
+    parser.add_argument("--selection",
+            choices=weiglej_selection.OPERATORS,
+            default=weiglej_population.OPTS["Selection"])
+    parser.add_argument("--csv", default=None,
+            help="write one row per trial to this file")
+    parser.add_argument("--summary", default=None,
+            help="write the summary row to this file")
+    args = parser.parse_args()
+
+    opts = dict(weiglej_population.OPTS)
+    opts.update({
+        "PopulationSize": args.population,
+        "Generations": args.generations,
+        "MutProb": args.mutprob,
+        "Selection": args.selection,
+    })
+    t = time.perf_counter()
+    results = run_trials(args.trials, args.seed, args.engine, opts,
+            args.processes)
+    elapsed = time.perf_counter() - t
+    summary = summarize(results)
+    print_summary(summary)
+    print("%d trials in %.2f s" % (len(results), elapsed))
+    if args.csv:
+        write_trials_csv(results, args.csv)
+    if args.summary:
+        write_summary_csv(summary, args.summary)
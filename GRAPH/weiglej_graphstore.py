@@ -0,0 +1,285 @@
+#-------------------------------------------#
+#       Compiled graph store                #
+#-------------------------------------------#
+# Parses either csv graph format of the repo in one streaming pass and
+# compiles it into a versioned binary file of CSR arrays next to the csv,
+# later loads memory map that file so nothing is copied or parsed:
+#   edgeweights  From,To,Weight rows like ASTAR/EdgeWeights.csv
+#   adjacency    a node then its neighbors per row, padded with blank
+#                cells, like BFS_DFS/BFS_DFS.csv
+
+import csv
+import mmap
+import os
+import struct
+from array import array
+
+STORE_MAGIC = b'WGRF'
+STORE_VERSION = 1
+# magic, version, format, nodes, labels bytes, edges, csv size, csv mtime
+STORE_HEADER = struct.Struct('<4sIIIqqqq')
+
+EDGEWEIGHTS = 1
+ADJACENCY = 2
+
+
+class CompiledGraph():
+    """ CSR arrays of a graph, either arrays fresh from a csv or
+    memoryviews over a mapped store file
+    params:
+        labels: list, node label for each integer id, None for adjacency
+                    files whose node ids are their integer labels
+        offsets: edges of node u are offsets[u] to offsets[u+1]
+        targets: node id each edge leads to
+        weights: weight of each edge, None for adjacency files
+    """
+    def __init__(self, labels, offsets, targets, weights=None):
+        self.labels = labels
+        self.offsets = offsets
+        self.targets = targets
+        self.weights = weights
+
+
+def _csr(n, sources, targets, weights=None):
+    """ Counting sort edges by source into CSR arrays, keeping the file
+    order of the edges of each source
+    """
+    offsets = array('q', bytes(8 * (n + 1)))
+    for u in sources:
+        offsets[u+1] += 1
+    for u in range(n):
+        offsets[u+1] += offsets[u]
+    fill = array('q', offsets)
+    csr_targets = array('i', bytes(4 * len(targets)))
+    csr_weights = None
+    if weights is not None:
+        csr_weights = array('d', bytes(8 * len(weights)))
+    for e in range(len(sources)):
+        u = sources[e]
+        csr_targets[fill[u]] = targets[e]
+        if weights is not None:
+            csr_weights[fill[u]] = weights[e]
+        fill[u] += 1
+    return offsets, csr_targets, csr_weights
+
+
+def parse_edgeweights(fn):
+    """ Parses a From,To,Weight csv, nodes get ids in the order they first
+    appear as the source of an edge, then as a target, only integer
+    arrays and one dict of labels are kept while streaming
+    params:
+        fn: str, csv file name
+    returns:
+        CompiledGraph
+    """
+    seen = {}
+    sources = array('i')
+    targets = array('i')
+    weights = array('d')
+    f = open(fn, 'r')
+    for row in csv.reader(f):
+        if not row:
+            continue
+        try:
+            weight = float(row[2])
+        except ValueError:
+            # header row
+            continue
+        sources.append(seen.setdefault(row[0], len(seen)))
+        targets.append(seen.setdefault(row[1], len(seen)))
+        weights.append(weight)
+    f.close()
+
+    # renumber, sources first in file order then target only nodes
+    remap = array('i', [-1]) * len(seen)
+    n = 0
+    for u in sources:
+        if remap[u] == -1:
+            remap[u] = n
+            n += 1
+    for u in range(len(seen)):
+        if remap[u] == -1:
+            remap[u] = n
+            n += 1
+    labels = [None] * n
+    for label, u in seen.items():
+        labels[remap[u]] = label
+    for e in range(len(sources)):
+        sources[e] = remap[sources[e]]
+        targets[e] = remap[targets[e]]
+    offsets, targets, weights = _csr(n, sources, targets, weights)
+    return CompiledGraph(labels, offsets, targets, weights)
+
+
+def adjacency_rows(f):
+    """ Parses the rows of an adjacency csv, skipping the header, empty
+    rows and the blank padding cells
+    params:
+        f: open file or iterable of csv lines
+    returns:
+        generator of (node id, list of neighbor ids)
+    """
+    for row in csv.reader(f):
+        if not row or not row[0].isdigit():
+            # header or empty row
+            continue
+        yield int(row[0]), [int(n) for n in row[1:] if n]
+
+
+def parse_adjacency(fn):
+    """ Parses an adjacency csv, node ids are the integer labels of the
+    csv so id 0 is unused
+    params:
+        fn: str, csv file name
+    returns:
+        CompiledGraph without labels or weights
+    """
+    sources = array('i')
+    starts = array('q')
+    flat = array('i')
+    f = open(fn, 'r')
+    for u, neighbors in adjacency_rows(f):
+        sources.append(u)
+        starts.append(len(flat))
+        flat.extend(neighbors)
+    f.close()
+    starts.append(len(flat))
+
+    # counting sort whole rows at a time, a node may span several rows
+    n = max(max(sources, default=0), max(flat, default=0)) + 1
+    offsets = array('q', bytes(8 * (n + 1)))
+    for i in range(len(sources)):
+        offsets[sources[i]+1] += starts[i+1] - starts[i]
+    for u in range(n):
+        offsets[u+1] += offsets[u]
+    fill = array('q', offsets)
+    targets = array('i', bytes(4 * len(flat)))
+    for i in range(len(sources)):
+        u = sources[i]
+        count = starts[i+1] - starts[i]
+        targets[fill[u]:fill[u] + count] = flat[starts[i]:starts[i+1]]
+        fill[u] += count
+
+    return CompiledGraph(None, offsets, targets)
+
+
+def csv_format(fn):
+    """ EDGEWEIGHTS if the csv has a Weight column, otherwise ADJACENCY,
+    a guess for callers that do not know the format of a file
+    """
+    with open(fn, 'r') as f:
+        header = next(csv.reader(f), [])
+    if len(header) > 2 and header[2].strip().lower() == 'weight':
+        return EDGEWEIGHTS
+    return ADJACENCY
+
+
+def store_file_name(fn):
+    """ Store file that sits next to the csv """
+    return os.path.splitext(fn)[0] + '.graph.bin'
+
+
+def write_store(graph, fn, store_fn):
+    """ Writes the CSR arrays of a graph in the store format, stamped with
+    the size and modification time of the csv it came from
+    params:
+        graph: CompiledGraph, or anything with the same attributes
+        fn: str, csv the graph came from
+        store_fn: str, file to write
+    """
+    st = os.stat(fn)
+    labels = b''
+    if graph.labels is not None:
+        labels = '\n'.join(graph.labels).encode()
+    n = len(graph.offsets) - 1
+    m = len(graph.targets)
+    fmt = ADJACENCY if graph.weights is None else EDGEWEIGHTS
+    header = STORE_HEADER.pack(STORE_MAGIC, STORE_VERSION, fmt, n,
+            len(labels), m, st.st_size, st.st_mtime_ns)
+    pad = -(len(header) + len(labels)) % 8
+    tmp_fn = store_fn + '.tmp'
+    with open(tmp_fn, 'wb') as f:
+        f.write(header)
+        f.write(labels)
+        f.write(bytes(pad))
+        f.write(graph.offsets)
+        if graph.weights is not None:
+            f.write(graph.weights)
+        f.write(graph.targets)
+    os.replace(tmp_fn, store_fn)
+
+
+def read_store(fn, store_fn, fmt=None):
+    """ Memory maps a store file, only the header and labels are read, the
+    CSR arrays are memoryviews over the mapped pages
+    params:
+        fn: str, csv the graph came from
+        store_fn: str, store file
+        fmt: EDGEWEIGHTS or ADJACENCY, the format the store must hold,
+                    either when None
+    returns:
+        CompiledGraph, or None if the file is missing, from another
+        version or format or older than the csv
+    """
+    try:
+        f = open(store_fn, 'rb')
+    except FileNotFoundError:
+        return None
+    with f:
+        header = f.read(STORE_HEADER.size)
+        if len(header) < STORE_HEADER.size:
+            return None
+        magic, version, store_fmt, n, labels_len, m, size, mtime_ns = (
+                STORE_HEADER.unpack(header))
+        st = os.stat(fn)
+        if (magic != STORE_MAGIC
+            or version != STORE_VERSION
+            or (fmt is not None and store_fmt != fmt)
+            or size != st.st_size
+            or mtime_ns != st.st_mtime_ns
+        ):
+            return None
+        fmt = store_fmt
+        labels = None
+        if fmt == EDGEWEIGHTS:
+            labels = f.read(labels_len).decode().split('\n') if n else []
+        start = STORE_HEADER.size + labels_len
+        start += -start % 8
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mm)
+    offsets = view[start:start + 8 * (n + 1)].cast('q')
+    start += 8 * (n + 1)
+    weights = None
+    if fmt == EDGEWEIGHTS:
+        weights = view[start:start + 8 * m].cast('d')
+        start += 8 * m
+    targets = view[start:start + 4 * m].cast('i')
+    return CompiledGraph(labels, offsets, targets, weights)
+
+
+def load_graph(fn, fmt=None):
+    """ Loads a csv graph of either format through its store file, the csv
+    is only parsed when the store is missing or older than the csv
+    params:
+        fn: str, csv file name
+        fmt: EDGEWEIGHTS or ADJACENCY, guessed with csv_format when None,
+                    which takes a From,To,Weight csv without a header row
+                    for an adjacency csv
+    returns:
+        CompiledGraph
+    """
+    store_fn = store_file_name(fn)
+    graph = read_store(fn, store_fn, fmt)
+    if graph is None:
+        if fmt is None:
+            fmt = csv_format(fn)
+        if fmt == EDGEWEIGHTS:
+            graph = parse_edgeweights(fn)
+        else:
+            graph = parse_adjacency(fn)
+        try:
+            write_store(graph, fn, store_fn)
+        except OSError:
+            pass
+
+    return graph
@@ -0,0 +1,241 @@
+#-------------------------------------------#
+#       Routing query server                #
+#-------------------------------------------#
+# Loads the A* and BFS/DFS graphs once and answers JSON lines requests
+# over a local Unix socket or TCP port, one request per line:
+#   {"id": 1, "method": "astar", "start": "1", "goal": "200"}
+#   {"id": 2, "method": "bfs", "start": 3, "goal": 77}
+#   {"id": 3, "method": "stats"}
+# methods are astar, bfs, dfs, bibfs (bidirectional BFS) and stats,
+# every reply is one JSON line carrying the same id
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+sys.path.insert(0, os.path.join(ROOT, "ASTAR"))
+sys.path.insert(0, os.path.join(ROOT, "BFS_DFS"))
+import weiglej_astar
+import weiglej_search
+
+# graphs of the process answering queries, set by load_graphs()
+graphs = {}
+
+
+def load_graphs(edgeweights_file, heuristics_file, adjacency_file):
+    """ Loads every graph the queries need into this process
+    params:
+        edgeweights_file: str, A* edgeweights csv
+        heuristics_file: str, A* heuristics csv, None to use landmarks
+        adjacency_file: str, BFS/DFS adjacency csv
+    """
+    graph = weiglej_astar.get_edgeweights(edgeweights_file)
+    if heuristics_file:
+        heuristics = weiglej_astar.get_heuristics(heuristics_file)
+    else:
+        heuristics = weiglej_astar.get_landmarks(edgeweights_file, graph)
+    graphs["astar"] = graph
+    graphs["heuristics"] = heuristics
+    graphs["adjacency"] = weiglej_search.get_adjacency(adjacency_file)
+    graphs["reverse_adjacency"] = graphs["adjacency"].reversed()
+    graphs["connectivity"] = weiglej_search.get_connectivity(adjacency_file,
+            graphs["adjacency"])
+
+
+def answer(method, start, goal):
+    """ Runs one query against the loaded graphs
+    params:
+        method: str, astar, bfs, dfs or bibfs
+        start: label of the starting node
+        goal: label of the goal node
+    returns:
+        dict with the cost (A* only) and path, path is False if there is none
+    """
+    if method == "astar":
+        graph = graphs["astar"]
+        start, goal = str(start), str(goal)
+        if start not in graph or goal not in graph:
+            raise KeyError("unknown node")
+        path = weiglej_astar.astar(graph, start, goal, graphs["heuristics"])
+        cost = weiglej_astar.calc_cost(graph, path, goal) if path else None
+        return {"cost": cost, "path": path}
+
+    if method not in ("bfs", "dfs", "bibfs"):
+        raise ValueError("unknown method " + str(method))
+    adj = graphs["adjacency"]
+    start, goal = int(start), int(goal)
+    if not (0 < start < len(adj) and 0 < goal < len(adj)):
+        raise KeyError("unknown node")
+    if start == goal:
+        return {"path": [start]}
+    if not graphs["connectivity"].connected(start, goal):
+        return {"path": False}
+    if method == "bfs":
+        return {"path": weiglej_search.bfs(adj, start, goal)}
+    if method == "dfs":
+        return {"path": weiglej_search.dfs(adj, start, goal)}
+    return {"path": weiglej_search.bidirectional_bfs(adj,
+            graphs["reverse_adjacency"], start, goal)}
+
+
+class Stats():
+    """ Latency histograms and queue depth of the server
+    params:
+        bounds: list, upper bounds in ms of the histogram buckets,
+                    the last bucket takes everything above
+    methods:
+        started: a request was queued
+        finished: a request was answered after ms milliseconds
+        report: dict snapshot of every counter
+    """
+    def __init__(self, bounds=(0.1, 0.2, 0.5, 1, 2, 5, 10, 20, 50, 100,
+            200, 500, 1000)):
+        self.bounds = list(bounds)
+        self.histograms = {}
+        self.depth = 0
+        self.max_depth = 0
+        self.errors = 0
+
+    def started(self):
+        self.depth += 1
+        if self.depth > self.max_depth:
+            self.max_depth = self.depth
+
+    def finished(self, method, ms, ok=True):
+        self.depth -= 1
+        if not ok:
+            self.errors += 1
+            return
+        if method not in self.histograms:
+            self.histograms[method] = {
+                "count": 0,
+                "total_ms": 0.0,
+                "buckets": [0] * (len(self.bounds) + 1),
+            }
+        hist = self.histograms[method]
+        hist["count"] += 1
+        hist["total_ms"] += ms
+        i = 0
+        while i < len(self.bounds) and self.bounds[i] < ms:
+            i += 1
+        hist["buckets"][i] += 1
+
+    def report(self):
+        return {
+            "queue_depth": self.depth,
+            "max_queue_depth": self.max_depth,
+            "errors": self.errors,
+            "bucket_bounds_ms": self.bounds,
+            "latency": self.histograms,
+        }
+
+
+class Server():
+    """ asyncio server that hands queries to a pool of worker processes
+    params:
+        executor: concurrent.futures executor whose workers ran load_graphs()
+    methods:
+        handle: serves one client connection
+    """
+    def __init__(self, executor):
+        self.executor = executor
+        self.stats = Stats()
+
+    async def reply(self, request, writer, lock):
+        """
+        answer one request and write its reply line
+        """
+        loop = asyncio.get_running_loop()
+        method = request.get("method")
+        reply = {"id": request.get("id")}
+        if method == "stats":
+            reply.update(self.stats.report())
+        else:
+            self.stats.started()
+            t0 = time.perf_counter()
+            ok = True
+            try:
+                reply.update(await loop.run_in_executor(self.executor, answer,
+                        method, request.get("start"), request.get("goal")))
+            except Exception as e:
+                ok = False
+                reply["error"] = type(e).__name__ + ": " + str(e)
+            ms = (time.perf_counter() - t0) * 1000
+            self.stats.finished(method, ms, ok)
+            reply["ms"] = ms
+        async with lock:
+            writer.write((json.dumps(reply) + "\n").encode())
+            await writer.drain()
+
+    async def handle(self, reader, writer):
+        # replies go out as soon as they are ready, so a slow query does not
+        # hold up the ones behind it on the same connection
+        lock = asyncio.Lock()
+        pending = set()
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict):
+                    raise ValueError("request is not an object")
+            except ValueError as e:
+                async with lock:
+                    writer.write((json.dumps({"error": str(e)}) + "\n").encode())
+                    await writer.drain()
+                continue
+            task = asyncio.create_task(self.reply(request, writer, lock))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+        if pending:
+            await asyncio.wait(pending)
+        writer.close()
+
+
+async def serve(args):
+    executor = ProcessPoolExecutor(args.workers, initializer=load_graphs,
+            initargs=(args.edgeweights, args.heuristics, args.adjacency))
+    # load once in the parent first, this also writes the binary caches the
+    # workers then memory map
+    load_graphs(args.edgeweights, args.heuristics, args.adjacency)
+    server = Server(executor)
+    if args.unix:
+        listener = await asyncio.start_unix_server(server.handle, args.unix)
+        print("Listening on " + args.unix)
+    else:
+        listener = await asyncio.start_server(server.handle, args.host,
+                args.port)
+        print("Listening on " + args.host + ":" + str(args.port))
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+if __name__=="__main__":
+    parser = argparse.ArgumentParser(description="A* and BFS/DFS query server")
+    parser.add_argument("--edgeweights",
+            default=os.path.join(ROOT, "ASTAR", "EdgeWeights.csv"))
+    parser.add_argument("--heuristics",
+            default=os.path.join(ROOT, "ASTAR", "minCosts.csv"),
+            help="A* heuristics csv, empty string to use landmarks")
+    parser.add_argument("--adjacency",
+            default=os.path.join(ROOT, "BFS_DFS", "BFS_DFS.csv"))
+    parser.add_argument("--unix", help="Unix socket path instead of TCP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    try:
+        asyncio.run(serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass